@@ -0,0 +1,224 @@
+import argparse  # Імпортуємо модуль для розбору аргументів командного рядка.
+import json    # Імпортуємо модуль для виводу результатів.
+import sys     # Імпортуємо модуль для стандартних потоків.
+from functools import lru_cache  # Імпортуємо кеш для повторного аналізу тих самих таблиць.
+
+from instrumentation import add_profile_argument, profiling
+from main import load_cipher, np
+
+# Парність кожного значення байта: кількість одиничних бітів за модулем 2.
+PARITY = bytes(bin(value).count("1") & 1 for value in range(256))
+
+# Найбільша кількість елементів проміжних масивів в одному пакеті score_sboxes.
+SCORE_BATCH_ELEMENTS = 1 << 22
+
+def _bits(size: int) -> int:
+    """Повертає кількість бітів n для таблиці розміром 2^n."""
+    bits = size.bit_length() - 1
+    if size < 2 or 1 << bits != size or bits > 8:
+        raise ValueError("Розмір таблиці має бути степенем двійки від 2 до 256.")
+    return bits
+
+def walsh_hadamard(values):
+    """Виконує швидке перетворення Уолша-Адамара списку довжиною 2^n на місці та повертає його."""
+    step = 1
+    while step < len(values):
+        for start in range(0, len(values), step * 2):
+            for index in range(start, start + step):
+                left, right = values[index], values[index + step]
+                values[index], values[index + step] = left + right, left - right  # Метелик перетворення
+        step *= 2
+    return values
+
+def difference_distribution_table(sbox):
+    """
+    Будує таблицю розподілу різниць: ddt[a][b] - кількість x, для яких S(x) XOR S(x XOR a) = b.
+    """
+    size = len(sbox)
+    table = [[0] * size for _ in range(size)]
+    for a in range(size):
+        row = table[a]
+        for x in range(size):
+            row[sbox[x] ^ sbox[x ^ a]] += 1
+    return table
+
+def linear_approximation_table(sbox):
+    """
+    Будує таблицю лінійних апроксимацій через перетворення Уолша-Адамара:
+    lat[a][b] = #{x: a·x = b·S(x)} - 2^(n-1).
+    """
+    size = len(sbox)
+    columns = []
+    for b in range(size):
+        # Спектр Уолша булевої функції b·S(x) дає стовпець b для всіх масок входу a одразу
+        spectrum = walsh_hadamard([1 - 2 * PARITY[b & sbox[x]] for x in range(size)])
+        columns.append([value // 2 for value in spectrum])
+    return [[columns[b][a] for b in range(size)] for a in range(size)]
+
+def differential_uniformity(ddt) -> int:
+    """Повертає найбільше значення таблиці розподілу різниць для ненульової вхідної різниці."""
+    return max(max(row) for row in ddt[1:])
+
+def nonlinearity(lat) -> int:
+    """Повертає нелінійність: 2^(n-1) мінус найбільше |lat[a][b]| для ненульової маски виходу b."""
+    size = len(lat)
+    return size // 2 - max(abs(lat[a][b]) for a in range(size) for b in range(1, size))
+
+def fixed_points(sbox) -> int:
+    """Повертає кількість нерухомих точок S(x) = x."""
+    return sum(1 for x, value in enumerate(sbox) if x == value)
+
+def avalanche_matrix(sbox):
+    """
+    Будує матрицю лавинного ефекту: m[i][j] - частка входів x, для яких зміна біта i входу змінює біт j виходу.
+    """
+    size = len(sbox)
+    bits = _bits(size)
+    matrix = []
+    for i in range(bits):
+        counts = [0] * bits
+        for x in range(size):
+            difference = sbox[x] ^ sbox[x ^ (1 << i)]
+            for j in range(bits):
+                counts[j] += (difference >> j) & 1
+        matrix.append([count / size for count in counts])
+    return matrix
+
+@lru_cache(maxsize=4096)
+def _analyze_cached(table: bytes) -> tuple:
+    """Обчислює показники таблиці, заданої її байтовим відбитком. Результат кешується."""
+    sbox = list(table)
+    ddt = difference_distribution_table(sbox)
+    lat = linear_approximation_table(sbox)
+    matrix = avalanche_matrix(sbox)
+    bits = len(matrix)
+    return (
+        ("bits", bits),
+        ("differential_uniformity", differential_uniformity(ddt)),
+        ("nonlinearity", nonlinearity(lat)),
+        ("max_linear_bias", max(abs(lat[a][b]) for a in range(len(sbox)) for b in range(1, len(sbox))) / len(sbox)),
+        ("fixed_points", fixed_points(sbox)),
+        ("avalanche", sum(map(sum, matrix)) / bits),  # Середня кількість змінених бітів виходу на біт входу
+        ("sac_max_deviation", max(abs(value - 0.5) for row in matrix for value in row)),
+    )
+
+def analyze_sbox(sbox) -> dict:
+    """
+    Обчислює показники якості таблиці підстановки розміром 2^n (n ≤ 8).
+
+    Результат кешується за вмістом таблиці, тож повторний аналіз того самого ключа нічого не коштує.
+
+    :return: Словник з ключами bits, differential_uniformity, nonlinearity, max_linear_bias, fixed_points,
+             avalanche та sac_max_deviation.
+    """
+    _bits(len(sbox))
+    return dict(_analyze_cached(bytes(sbox)))
+
+def analyze_permutation(permutation) -> dict:
+    """
+    Обчислює показники формули перестановки.
+
+    :return: Словник з кількістю нерухомих бітів та кількістю бітів, які переходять в іншу тетраду.
+    """
+    return {
+        "fixed_points": sum(1 for i, target in enumerate(permutation) if i == target),
+        "nibble_crossings": sum(1 for i, target in enumerate(permutation) if i // 4 != target // 4),
+    }
+
+def analyze_cipher(cipher) -> dict:
+    """
+    Обчислює показники таблиці констант, формули перестановки та комбінованого перетворення S→P.
+    """
+    constants = cipher.constant_table.constants
+    return {
+        "s_box": analyze_sbox([constants[i] for i in range(16)]),
+        "permutation": analyze_permutation(cipher.permutation_formula.permutation_values),
+        "combined": analyze_sbox(cipher.compile()['encrypt']),
+    }
+
+def _walsh_hadamard_batch(values):
+    """Виконує швидке перетворення Уолша-Адамара вздовж останньої осі масиву NumPy."""
+    size = values.shape[-1]
+    step = 1
+    while step < size:
+        shaped = values.reshape(values.shape[:-1] + (size // (step * 2), 2, step))
+        left, right = shaped[..., 0, :].copy(), shaped[..., 1, :]
+        shaped[..., 0, :] += right
+        shaped[..., 1, :] = left - right
+        step *= 2
+    return values
+
+def score_sboxes(sboxes) -> dict:
+    """
+    Векторизовано обчислює основні показники для пакета таблиць однакового розміру.
+
+    :param sboxes: Послідовність таблиць або масив форми (кількість, 2^n).
+    :return: Словник з ключами differential_uniformity, nonlinearity та fixed_points; значення - списки
+             у порядку вхідних таблиць.
+    """
+    if np is None:
+        # Без NumPy аналізуємо таблиці по одній (з тим самим кешем)
+        reports = [analyze_sbox(sbox) for sbox in sboxes]
+        return {key: [report[key] for report in reports]
+                for key in ("differential_uniformity", "nonlinearity", "fixed_points")}
+
+    table = np.asarray(sboxes, dtype=np.int64)
+    count, size = table.shape
+    _bits(size)
+    batch = max(1, SCORE_BATCH_ELEMENTS // (size * size))  # Обмежуємо пам'ять для 8-бітних таблиць
+    if count > batch:
+        parts = [score_sboxes(table[start:start + batch]) for start in range(0, count, batch)]
+        return {key: [value for part in parts for value in part[key]] for key in parts[0]}
+    inputs = np.arange(size)
+
+    # Таблиця розподілу різниць: для кожної вхідної різниці a рахуємо вихідні різниці всіх таблиць разом
+    offsets = (np.arange(count) * size)[:, None]
+    uniformity = np.zeros(count, dtype=np.int64)
+    for a in range(1, size):
+        differences = table ^ table[:, inputs ^ a]
+        counts = np.bincount((differences + offsets).ravel(), minlength=count * size).reshape(count, size)
+        uniformity = np.maximum(uniformity, counts.max(axis=1))
+
+    # Спектр Уолша всіх функцій b·S(x) для всіх таблиць одночасно
+    parity = np.frombuffer(PARITY, dtype=np.uint8).astype(np.int64)
+    masks = np.arange(1, size)[None, :, None]
+    signs = (1 - 2 * parity[masks & table[:, None, :]]).astype(np.int32)  # Форма (кількість, 2^n - 1, 2^n)
+    spectrum = _walsh_hadamard_batch(signs)
+    linearity = np.abs(spectrum).max(axis=(1, 2)) // 2
+
+    return {
+        "differential_uniformity": uniformity.tolist(),
+        "nonlinearity": (size // 2 - linearity).tolist(),
+        "fixed_points": (table == inputs).sum(axis=1).tolist(),
+    }
+
+def build_arg_parser():
+    """Створює розбирач аргументів командного рядка."""
+    parser = argparse.ArgumentParser(description="Криптоаналітичні показники таблиці констант та формули перестановки.")
+    parser.add_argument("--sbox", help="Файл JSON з таблицею констант (за замовчуванням стандартна таблиця)")
+    parser.add_argument("--pbox", help="Файл JSON з формулою перестановки (за замовчуванням стандартна формула)")
+    add_profile_argument(parser)
+    return parser
+
+def main(argv=None) -> int:
+    """Точка входу командного рядка: виводить показники у форматі JSON."""
+    args = build_arg_parser().parse_args(argv)
+    with profiling(args.profile):
+        return _run_command(args)
+
+def _run_command(args) -> int:
+    """Виконує команду з розібраними аргументами."""
+    try:
+        cipher = load_cipher(args.sbox, args.pbox)
+    except (OSError, ValueError) as error:
+        print(f"Не вдалося завантажити ключ: {error}", file=sys.stderr)
+        return 1
+    if cipher.block_bytes != 1:
+        print("Аналіз підтримується лише для побайтового шифру.", file=sys.stderr)
+        return 2
+    json.dump(analyze_cipher(cipher), sys.stdout, indent=2)
+    print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import argparse  # Імпортуємо модуль для розбору аргументів командного рядка.
+import itertools  # Імпортуємо модуль для перебору впорядкувань бітів.
+import json    # Імпортуємо модуль для виводу результатів.
+import os      # Імпортуємо модуль для кількості ядер.
+import random  # Імпортуємо модуль для відтворюваних відомих відкритих текстів.
+import secrets  # Імпортуємо модуль для криптографічно стійкого початкового значення.
+import sys     # Імпортуємо модуль для стандартних потоків.
+import time    # Імпортуємо модуль для вимірювання часу відновлення.
+from concurrent.futures import ProcessPoolExecutor  # Імпортуємо пул процесів для паралельного пошуку.
+
+from instrumentation import add_profile_argument, profiling
+from main import ConstantTable, PermutationFormula, SPBlockCipher, load_cipher
+
+# Кількість відомих пар, яку генерує демонстраційний режим.
+DEFAULT_PAIRS = 64
+
+def normalize_pairs(pairs):
+    """
+    Перетворює пари (відкритий байт, зашифрований байт) на словник без повторів.
+
+    :raises ValueError: Якщо значення поза межами байта або один відкритий байт має різні шифротексти.
+    """
+    known = {}
+    for plaintext, ciphertext in pairs:
+        if not (0 <= plaintext < 256 and 0 <= ciphertext < 256):
+            raise ValueError("Значення пар мають бути байтами від 0 до 255.")
+        if known.setdefault(plaintext, ciphertext) != ciphertext:
+            raise ValueError(f"Відкритий байт {plaintext} має різні шифротексти: пари не від одного ключа.")
+    return known
+
+def _extend(mapping, inverse, constraints) -> bool:
+    """
+    Додає обмеження S[x] = z до часткової таблиці констант, зберігаючи взаємну однозначність.
+
+    :return: False при першій суперечності (таблиці в такому разі більше не використовуються).
+    """
+    for x, z in constraints:
+        current = mapping[x]
+        if current < 0:
+            if inverse[z] >= 0:
+                return False  # Значення z уже зайняте іншою тетрадою
+            mapping[x] = z
+            inverse[z] = x
+        elif current != z:
+            return False
+    return True
+
+def _nibble(ciphertexts, positions):
+    """Збирає тетради P^-1(y): біт i тетради - біт positions[i] шифротексту."""
+    return [sum(((y >> position) & 1) << i for i, position in enumerate(positions)) for y in ciphertexts]
+
+def _search_prefixes(prefixes, plaintexts, ciphertexts):
+    """
+    Перевіряє формули перестановки з заданими позиціями молодших чотирьох бітів. Виконується в робочому процесі.
+
+    Біти 0-3 проміжного значення S(x) після P потрапляють на позиції prefix, тож уже префікс визначає молодші
+    тетради P^-1(y) і обмеження S[молодша тетрада x] = молодша тетрада P^-1(y). Лише префікси без суперечностей
+    доповнюються всіма 24 впорядкуваннями решти бітів з перевіркою старших тетрад.
+
+    :return: Список пар (формула перестановки, часткова таблиця констант з -1 для невідомих значень).
+    """
+    low = [x & 0xF for x in plaintexts]
+    high = [x >> 4 for x in plaintexts]
+    candidates = []
+    for prefix in prefixes:
+        mapping, inverse = [-1] * 16, [-1] * 16
+        if not _extend(mapping, inverse, zip(low, _nibble(ciphertexts, prefix))):
+            continue  # Відсікаємо одразу 24 повні формули
+        rest = [bit for bit in range(8) if bit not in prefix]
+        for suffix in itertools.permutations(rest):
+            full_mapping, full_inverse = mapping[:], inverse[:]
+            if _extend(full_mapping, full_inverse, zip(high, _nibble(ciphertexts, suffix))):
+                candidates.append((list(prefix + suffix), full_mapping))
+    return candidates
+
+def search_keys(pairs, workers: int = 1, executor=None):
+    """
+    Знаходить усі ключі (формула перестановки, часткова таблиця констант), сумісні з відомими парами.
+
+    :param pairs: Словник або послідовність пар (відкритий байт, зашифрований байт).
+    :param workers: Кількість процесів (1 - без пулу, 0 або None - за кількістю ядер).
+    :param executor: Готовий пул процесів; якщо передано, workers визначає лише кількість завдань.
+    :return: Список пар (формула перестановки, часткова таблиця констант) у порядку перебору.
+    """
+    known = pairs if isinstance(pairs, dict) else normalize_pairs(pairs)
+    plaintexts, ciphertexts = list(known), list(known.values())
+    prefixes = list(itertools.permutations(range(8), 4))  # 1680 префіксів замість 40320 формул
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 and executor is None:
+        return _search_prefixes(prefixes, plaintexts, ciphertexts)
+    size = -(-len(prefixes) // (workers * 4))  # По кілька завдань на процес для рівномірного навантаження
+    batches = [prefixes[start:start + size] for start in range(0, len(prefixes), size)]
+    arguments = ([plaintexts] * len(batches), [ciphertexts] * len(batches))
+    if executor is not None:
+        parts = executor.map(_search_prefixes, batches, *arguments)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_search_prefixes, batches, *arguments))
+    return [candidate for part in parts for candidate in part]
+
+def _complete(mapping):
+    """Доповнює таблицю констант, у якій невідоме лише одне значення. Повертає None, якщо невідомих більше."""
+    missing = [x for x in range(16) if mapping[x] < 0]
+    if len(missing) > 1:
+        return None
+    if missing:
+        mapping = mapping[:]
+        mapping[missing[0]] = (set(range(16)) - set(mapping)).pop()
+    return mapping
+
+def _encryption_table(permutation, sbox) -> bytes:
+    """Повертає 256-байтову таблицю шифрування ключа."""
+    cipher = SPBlockCipher(ConstantTable(dict(enumerate(sbox))), PermutationFormula(permutation))
+    return cipher.compile()['encrypt']
+
+def resolve(candidates):
+    """
+    Перевіряє, чи визначають кандидати шифр однозначно.
+
+    Ключі, які відрізняються однаковою перестановкою бітів усередині обох тетрад, задають те саме
+    шифрування, тому однозначність перевіряється за таблицями шифрування, а не за самими ключами.
+
+    :return: Пара (таблиця шифрування, перший повний ключ як (формула перестановки, таблиця констант)) або
+             (None, None), якщо кандидатів немає, вони неповні або задають різні шифри.
+    """
+    table = key = None
+    for permutation, mapping in candidates:
+        sbox = _complete(mapping)
+        if sbox is None:
+            return None, None
+        current = _encryption_table(permutation, sbox)
+        if table is None:
+            table, key = current, (permutation, sbox)
+        elif current != table:
+            return None, None
+    return table, key
+
+def matches_key(report, cipher) -> bool:
+    """Перевіряє, чи задає ключ, відновлений recover_key, те саме шифрування, що й шифр cipher."""
+    if not report.get("recovered"):
+        return False
+    return _encryption_table(report["permutation"], report["constants"]) == cipher.compile_tables()[0]
+
+def recover_key(pairs, workers: int = 1) -> dict:
+    """
+    Відновлює ключ за відомими парами та визначає, скільки перших пар достатньо для однозначного відновлення.
+
+    Кількість пар шукається подвоєнням, а потім двійковим пошуком: із додаванням пар кандидатів лише меншає.
+
+    :param pairs: Послідовність пар (відкритий байт, зашифрований байт) у порядку надходження.
+    :param workers: Кількість процесів (1 - без пулу, 0 або None - за кількістю ядер).
+    :return: Словник з ознакою успіху, кількістю потрібних пар, кількістю еквівалентних ключів, відновленими
+             таблицею констант і формулою перестановки, часом пошуку з потрібними парами та загальним часом.
+    """
+    pairs = list(pairs)
+    normalize_pairs(pairs)  # Перевіряємо всі пари одразу
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    results = {}
+
+    def attempt(count):
+        """Шукає ключ за першими count парами; результати запам'ятовуються."""
+        if count not in results:
+            search_started = time.perf_counter()
+            candidates = search_keys(normalize_pairs(pairs[:count]), workers, executor)
+            table, key = resolve(candidates)
+            results[count] = (table, key, len(candidates), time.perf_counter() - search_started)
+        return results[count]
+
+    try:
+        needed = None
+        low, high = 0, 1
+        while high < len(pairs) and attempt(high)[0] is None:
+            low, high = high, high * 2
+        high = min(high, len(pairs))
+        if pairs and attempt(high)[0] is not None:
+            while high - low > 1:  # Найменша кількість пар у проміжку (low, high]
+                middle = (low + high) // 2
+                if attempt(middle)[0] is not None:
+                    high = middle
+                else:
+                    low = middle
+            needed = high
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    report = {
+        "recovered": needed is not None,
+        "pairs_available": len(pairs),
+        "pairs_needed": needed,
+        "distinct_plaintexts": len(normalize_pairs(pairs[:needed])) if needed else None,
+        "equivalent_keys": None,
+        "constants": None,
+        "permutation": None,
+        "search_seconds": None,
+        "total_seconds": time.perf_counter() - started,
+    }
+    if needed is not None:
+        _, (permutation, sbox), count, seconds = results[needed]
+        report.update(equivalent_keys=count, constants=sbox, permutation=permutation, search_seconds=seconds)
+    return report
+
+def known_pairs(cipher, count: int, seed=None):
+    """Повертає count пар (випадковий відкритий байт, шифротекст) для ключа cipher."""
+    rng = random.Random(seed)
+    table = cipher.compile()['encrypt']
+    return [(x, table[x]) for x in (rng.randrange(256) for _ in range(count))]
+
+def build_arg_parser():
+    """Створює розбирач аргументів командного рядка."""
+    parser = argparse.ArgumentParser(
+        description="Відновлення таблиці констант і формули перестановки за відомими відкритими текстами.")
+    parser.add_argument("--plaintext", help="Файл відомого відкритого тексту")
+    parser.add_argument("--ciphertext", help="Файл відповідного шифротексту")
+    parser.add_argument("--sbox", help="Таблиця констант ключа для демонстраційних пар (замість файлів)")
+    parser.add_argument("--pbox", help="Формула перестановки ключа для демонстраційних пар (замість файлів)")
+    parser.add_argument("--pairs", type=int, default=DEFAULT_PAIRS, help="Кількість демонстраційних пар")
+    parser.add_argument("--seed", type=int, help="Початкове значення (за замовчуванням з модуля secrets)")
+    parser.add_argument("--workers", type=int, default=1, help="Кількість процесів (0 - за кількістю ядер)")
+    add_profile_argument(parser)
+    return parser
+
+def main(argv=None) -> int:
+    """Точка входу командного рядка: виводить звіт відновлення у форматі JSON."""
+    args = build_arg_parser().parse_args(argv)
+    with profiling(args.profile):
+        return _run_command(args)
+
+def _run_command(args) -> int:
+    """Виконує команду з розібраними аргументами."""
+    if bool(args.plaintext) != bool(args.ciphertext):
+        print("Параметри --plaintext та --ciphertext задаються разом.", file=sys.stderr)
+        return 2
+    if args.plaintext and (args.sbox or args.pbox):
+        print("Файли пар не можна поєднувати з --sbox та --pbox.", file=sys.stderr)
+        return 2
+    if args.pairs <= 0 or args.workers < 0:
+        print("Кількість пар має бути додатною, а кількість процесів - невід'ємною.", file=sys.stderr)
+        return 2
+    cipher = None
+    try:
+        if args.plaintext:
+            with open(args.plaintext, "rb") as f:
+                plaintext = f.read()
+            with open(args.ciphertext, "rb") as f:
+                ciphertext = f.read()
+            if len(plaintext) != len(ciphertext):
+                raise ValueError("Відкритий текст і шифротекст мають бути однакової довжини.")
+            pairs = list(zip(plaintext, ciphertext))
+        else:
+            seed = args.seed if args.seed is not None else secrets.randbits(64)
+            if args.sbox or args.pbox:
+                cipher = load_cipher(args.sbox, args.pbox)
+            else:
+                # Випадковий ключ, відтворюваний за початковим значенням
+                rng = random.Random(seed)
+                cipher = SPBlockCipher(ConstantTable(dict(enumerate(rng.sample(range(16), 16)))),
+                                       PermutationFormula(rng.sample(range(8), 8)))
+            if cipher.block_bytes != 1:
+                raise ValueError("Атака підтримується лише для побайтового шифру.")
+            pairs = known_pairs(cipher, args.pairs, seed)
+        report = recover_key(pairs, args.workers)
+    except (OSError, ValueError) as error:
+        print(f"Не вдалося виконати відновлення: {error}", file=sys.stderr)
+        return 1
+    if cipher is not None and report["recovered"]:
+        # Для демонстраційного ключа перевіряємо, що відновлений ключ шифрує так само
+        report["matches_key"] = _encryption_table(report["permutation"], report["constants"]) == \
+            cipher.compile()['encrypt']
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0 if report["recovered"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import argparse  # Імпортуємо модуль для розбору аргументів командного рядка.
+import json    # Імпортуємо модуль для збереження результатів у JSON.
+import os      # Імпортуємо модуль для генерації випадкових даних та кількості ядер.
+import platform  # Імпортуємо модуль для опису середовища вимірювання.
+import shutil  # Імпортуємо модуль для видалення тимчасового каталогу.
+import sys     # Імпортуємо модуль для стандартних потоків.
+import tempfile  # Імпортуємо модуль для тимчасових файлів потокового випадку.
+import time    # Імпортуємо модуль для вимірювання часу.
+
+from instrumentation import add_profile_argument, profiling
+from main import (SPBlockCipher, ParallelSPCipher, ThreadedSPCipher, WideBlockCipher, NumpySPBackend, SwarSPEngine,
+                  np, run_cli)
+import modes
+
+# Розміри вхідних даних за замовчуванням: від 16 Б до 256 МБ з кроком 16×. Більші розміри (--sizes) потребують
+# у кілька разів більше пам'яті, ніж самі дані: вхід, результати та буфери паралельних шляхів.
+DEFAULT_SIZES = [16 << (4 * i) for i in range(7)]
+
+# Мінімальний сумарний час вимірювання одного випадку в секундах.
+DEFAULT_MIN_TIME = 0.2
+
+# Допустиме падіння пропускної здатності відносно базових результатів (10 %).
+DEFAULT_THRESHOLD = 0.10
+
+class BenchmarkCase:
+    """Один шлях шифрування, який вимірюється на даних різного розміру."""
+
+    def __init__(self, name: str, setup, max_size: int):
+        """
+        Ініціалізація випадку.
+
+        :param name: Назва випадку в результатах.
+        :param setup: Функція, яка отримує вхідні дані та повертає функцію без аргументів для вимірювання.
+        :param max_size: Найбільший розмір даних, на якому випадок має сенс вимірювати.
+        """
+        self.name = name
+        self.setup = setup
+        self.max_size = max_size
+
+def _per_byte(cipher):
+    """Повертає випадок побайтових викликів методів SPBlockCipher."""
+    def setup(data):
+        def run():
+            return bytes(cipher.permutation(cipher.constant_substitution(b)) for b in data)
+        return run
+    return setup
+
+def _compiled_tables(cipher):
+    """Повертає випадок побайтового пошуку у скомпільованій таблиці."""
+    def setup(data):
+        table = cipher.compile()['encrypt']
+        def run():
+            return bytes([table[b] for b in data])
+        return run
+    return setup
+
+def _bulk(cipher):
+    """Повертає випадок масового шифрування encrypt_bytes."""
+    def setup(data):
+        return lambda: cipher.encrypt_bytes(data)
+    return setup
+
+def _stream(directory: str):
+    """
+    Повертає випадок шифрування файлу командою командного рядка (main.py encrypt -i ... -o ...): разом із
+    завантаженням ключа та читанням і записом файлів у каталозі directory.
+    """
+    source = os.path.join(directory, "input.bin")
+    target = os.path.join(directory, "output.bin")
+    def setup(data):
+        with open(source, "wb") as f:
+            f.write(data)
+        def run():
+            if run_cli(["encrypt", "-i", source, "-o", target]) != 0:
+                raise RuntimeError("Команда encrypt завершилась з помилкою.")
+        return run
+    return setup
+
+def _parallel(engine):
+    """Повертає випадок паралельного шифрування в пулі процесів або потоків."""
+    def setup(data):
+        return lambda: engine.encrypt_bytes(data)
+    return setup
+
+def _numpy(backend):
+    """Повертає випадок векторизованого шифрування NumPy."""
+    def setup(data):
+        array = np.frombuffer(data, dtype=np.uint8)
+        out = np.empty_like(array)
+        return lambda: backend.encrypt(array, out=out)
+    return setup
+
+def _wide(cipher):
+    """Повертає випадок шифрування широким блоком."""
+    def setup(data):
+        data = data[:len(data) - len(data) % cipher.block_bytes]
+        return lambda: cipher.encrypt_bytes(data)
+    return setup
+
+def _ctr(cipher):
+    """Повертає випадок шифрування в режимі CTR."""
+    def setup(data):
+        iv = bytes(cipher.block_bytes)
+        return lambda: modes.encrypt(cipher, modes.CTR, data, iv)
+    return setup
+
+def build_cases(workers=None):
+    """
+    Створює всі випадки вимірювання.
+
+    :param workers: Кількість процесів для паралельного випадку.
+    :return: Пара (список випадків, функція звільнення ресурсів).
+    """
+    cipher = SPBlockCipher()
+    wide = WideBlockCipher(block_size=128)
+    engine = ParallelSPCipher(cipher, workers)
+    threaded = ThreadedSPCipher(cipher, workers)
+    directory = tempfile.mkdtemp(prefix="sp-benchmark-")  # Файли потокового випадку
+    cases = [
+        BenchmarkCase("per_byte", _per_byte(cipher), 1 << 20),  # Повільні шляхи обмежені розміром
+        BenchmarkCase("compiled_tables", _compiled_tables(cipher), 1 << 24),
+        BenchmarkCase("bulk_bytes", _bulk(cipher), 1 << 30),
+        BenchmarkCase("stream", _stream(directory), 1 << 30),
+        BenchmarkCase("parallel", _parallel(engine), 1 << 30),
+        BenchmarkCase("threaded", _parallel(threaded), 1 << 30),
+        BenchmarkCase("swar", _bulk(SwarSPEngine(cipher)), 1 << 26),
+        BenchmarkCase("wide_block_128", _wide(wide), 1 << 20),
+        BenchmarkCase("ctr_wide_block_128", _ctr(wide), 1 << 20),
+    ]
+    if np is not None:
+        cases.append(BenchmarkCase("numpy", _numpy(NumpySPBackend(cipher)), 1 << 30))
+
+    def cleanup():
+        engine.close()
+        threaded.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    return cases, cleanup
+
+def measure(function, min_time: float = DEFAULT_MIN_TIME) -> tuple:
+    """
+    Вимірює найкращий час одного виклику функції, повторюючи її, доки сумарний час не перевищить min_time.
+
+    :return: Пара (найкращий час у секундах, кількість повторів).
+    """
+    best = float('inf')
+    spent = 0.0
+    repeats = 0
+    while spent < min_time or repeats < 3:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        repeats += 1
+        if elapsed > min_time:
+            break  # Великі розміри достатньо виміряти один раз
+    return best, repeats
+
+def run_benchmarks(sizes=None, case_names=None, min_time: float = DEFAULT_MIN_TIME, workers=None, log=None):
+    """
+    Вимірює всі випадки на всіх розмірах.
+
+    :param sizes: Розміри вхідних даних у байтах.
+    :param case_names: Назви випадків, які потрібно виміряти. Якщо не вказано, вимірюються всі.
+    :param min_time: Мінімальний сумарний час вимірювання одного випадку.
+    :param workers: Кількість процесів для паралельного випадку.
+    :param log: Потік для виводу проміжних результатів.
+    :return: Словник з описом середовища та списком результатів.
+    """
+    sizes = sorted(sizes or DEFAULT_SIZES)
+    cases, cleanup = build_cases(workers)
+    results = []
+    try:
+        for size in sizes:
+            data = os.urandom(size)  # Ті самі дані для всіх випадків одного розміру
+            for case in cases:
+                if (case_names and case.name not in case_names) or size > case.max_size:
+                    continue
+                seconds, repeats = measure(case.setup(data), min_time)
+                result = {
+                    "case": case.name,
+                    "size": size,
+                    "seconds": seconds,
+                    "repeats": repeats,
+                    "bytes_per_second": size / seconds if seconds else float('inf'),
+                    "ns_per_byte": seconds * 1e9 / size,
+                }
+                results.append(result)
+                if log is not None:
+                    print(f"{case.name:>20} {size:>12} Б {result['bytes_per_second'] / 1e6:>12.2f} МБ/с "
+                          f"{result['ns_per_byte']:>10.3f} нс/байт", file=log)
+            del data
+    finally:
+        cleanup()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Порівнює результати з базовими.
+
+    Випадок з базових результатів, якого немає в поточних, теж вважається регресією: інакше випадок, що
+    перестав вимірюватися (або падає), непомітно випав би з порівняння.
+
+    :param threshold: Допустиме відносне падіння пропускної здатності.
+    :return: Список регресій: словники з полями case, size, baseline, current та change. Для відсутніх
+             випадків current та change дорівнюють None.
+    """
+    reference = {(item["case"], item["size"]): item["bytes_per_second"] for item in baseline["results"]}
+    measured = {(item["case"], item["size"]) for item in current["results"]}
+    regressions = [
+        {"case": case, "size": size, "baseline": reference[case, size], "current": None, "change": None}
+        for case, size in reference if (case, size) not in measured
+    ]
+    for item in current["results"]:
+        key = (item["case"], item["size"])
+        if key not in reference:
+            continue  # Нові випадки порівнювати нема з чим
+        change = item["bytes_per_second"] / reference[key] - 1
+        if change < -threshold:
+            regressions.append({
+                "case": item["case"],
+                "size": item["size"],
+                "baseline": reference[key],
+                "current": item["bytes_per_second"],
+                "change": change,
+            })
+    return regressions
+
+def _report_regressions(regressions, threshold: float) -> int:
+    """Виводить регресії та повертає код завершення."""
+    if not regressions:
+        print(f"Регресій понад {threshold:.0%} не виявлено.")
+        return 0
+    for item in regressions:
+        if item['current'] is None:
+            print(f"Випадок {item['case']} на {item['size']} Б є в базових результатах, але не виміряний.",
+                  file=sys.stderr)
+            continue
+        print(f"Регресія {item['case']} на {item['size']} Б: {item['baseline'] / 1e6:.2f} -> "
+              f"{item['current'] / 1e6:.2f} МБ/с ({item['change']:+.1%})", file=sys.stderr)
+    return 1
+
+def build_arg_parser():
+    """Створює розбирач аргументів командного рядка."""
+    parser = argparse.ArgumentParser(description="Вимірювання швидкодії всіх шляхів шифрування.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Виміряти швидкодію")
+    run.add_argument("-o", "--output", help="Файл JSON для результатів (за замовчуванням stdout)")
+    run.add_argument("--sizes", type=int, nargs="+", help="Розміри вхідних даних у байтах")
+    run.add_argument("--max-size", type=int, help="Пропустити розміри, більші за вказаний")
+    run.add_argument("--cases", nargs="+", help="Назви випадків для вимірювання")
+    run.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="Мінімальний час вимірювання випадку")
+    run.add_argument("--workers", type=int, help="Кількість процесів для паралельного випадку")
+    run.add_argument("--baseline", help="Файл базових результатів для порівняння після вимірювання")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустиме падіння швидкодії")
+    add_profile_argument(run)
+
+    compare = subparsers.add_parser("compare", help="Порівняти результати з базовими")
+    compare.add_argument("baseline", help="Файл базових результатів")
+    compare.add_argument("current", help="Файл поточних результатів")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустиме падіння швидкодії")
+    add_profile_argument(compare)
+    return parser
+
+def main(argv=None) -> int:
+    """Точка входу командного рядка. Повертає код завершення."""
+    args = build_arg_parser().parse_args(argv)
+    with profiling(args.profile):
+        return _run_command(args)
+
+def _run_command(args) -> int:
+    """Виконує команду з розібраними аргументами."""
+    if args.command == "compare":
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        with open(args.current, "r") as f:
+            current = json.load(f)
+        return _report_regressions(compare_results(baseline, current, args.threshold), args.threshold)
+
+    sizes = args.sizes or DEFAULT_SIZES
+    if args.max_size:
+        sizes = [size for size in sizes if size <= args.max_size]
+    report = run_benchmarks(sizes, args.cases, args.min_time, args.workers, log=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        return _report_regressions(compare_results(baseline, report, args.threshold), args.threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import argparse  # Імпортуємо модуль для розбору аргументів командного рядка.
+import json    # Імпортуємо модуль для виводу результатів.
+import os      # Імпортуємо модуль для кількості ядер.
+import random  # Імпортуємо модуль для відтворюваних псевдовипадкових послідовностей.
+import secrets  # Імпортуємо модуль для криптографічно стійкого початкового значення.
+import sys     # Імпортуємо модуль для стандартних потоків.
+from concurrent.futures import ProcessPoolExecutor  # Імпортуємо пул процесів для паралельного пошуку.
+
+from instrumentation import add_profile_argument, profiling
+from main import ConstantTable, PermutationFormula
+from analysis import PARITY, difference_distribution_table, walsh_hadamard, analyze_sbox, analyze_permutation
+
+# Найбільша кількість обмінів в одному завданні пошуку.
+DEFAULT_MAX_ITERATIONS = 200000
+
+# Кількість обмінів без покращення, після якої пошук починається з нової випадкової таблиці.
+DEFAULT_PATIENCE = 2000
+
+# Імовірність прийняти обмін, який погіршує оцінку (щоб виходити з локальних мінімумів).
+ACCEPT_WORSE = 0.05
+
+# Штраф за кожну нерухому точку, якщо вони заборонені.
+FIXED_POINT_PENALTY = 4
+
+class IncrementalSBoxScore:
+    """
+    Оцінка таблиці підстановки, яка оновлюється після обміну двох значень без повного перерахунку.
+
+    Оцінка - сума перевищень цільових меж у таблиці розподілу різниць та спектрі Уолша (LAT) плюс штраф за
+    нерухомі точки; нуль означає, що таблиця відповідає всім вимогам. Після обміну S[i] і S[j] змінюються лише
+    пари (x, x XOR a) з x ∈ {i, i XOR a, j, j XOR a} та доданки спектра для x ∈ {i, j}.
+    """
+
+    def __init__(self, sbox, max_uniformity: int, min_nonlinearity: int, allow_fixed_points: bool = False):
+        """
+        Ініціалізація оцінки з повним обчисленням таблиць.
+
+        :param sbox: Початкова таблиця підстановки розміром 2^n.
+        :param max_uniformity: Найбільша допустима диференціальна рівномірність.
+        :param min_nonlinearity: Найменша допустима нелінійність.
+        :param allow_fixed_points: Чи допускаються нерухомі точки.
+        """
+        self.sbox = list(sbox)
+        self.size = len(self.sbox)
+        self.max_uniformity = max_uniformity
+        self.max_walsh = self.size - 2 * min_nonlinearity  # |W| ≤ 2^n - 2·NL
+        self.fixed_penalty = 0 if allow_fixed_points else FIXED_POINT_PENALTY
+        self.ddt = difference_distribution_table(self.sbox)
+        # Спектр Уолша: walsh[a][b] = Σ (-1)^(a·x ⊕ b·S(x))
+        columns = [walsh_hadamard([1 - 2 * PARITY[b & self.sbox[x]] for x in range(self.size)])
+                   for b in range(self.size)]
+        self.walsh = [[columns[b][a] for b in range(self.size)] for a in range(self.size)]
+        self.fixed_points = sum(1 for x, value in enumerate(self.sbox) if x == value)
+        self.cost = (
+            sum(self._ddt_penalty(value) for row in self.ddt[1:] for value in row)
+            + sum(self._walsh_penalty(value) for row in self.walsh for value in row[1:])
+            + self.fixed_penalty * self.fixed_points
+        )
+
+    def _ddt_penalty(self, value: int) -> int:
+        """Штраф за перевищення диференціальної рівномірності в одній клітинці."""
+        return value - self.max_uniformity if value > self.max_uniformity else 0
+
+    def _walsh_penalty(self, value: int) -> int:
+        """Штраф за перевищення межі спектра Уолша в одній клітинці."""
+        value = abs(value)
+        return (value - self.max_walsh) // 2 if value > self.max_walsh else 0
+
+    def _update_ddt(self, affected, delta: int):
+        """Додає або віднімає внесок входів affected[a] у кожен рядок таблиці розподілу різниць."""
+        sbox = self.sbox
+        for a in range(1, self.size):
+            row = self.ddt[a]
+            for x in affected[a]:
+                output = sbox[x] ^ sbox[x ^ a]
+                old = row[output]
+                row[output] = old + delta
+                self.cost += self._ddt_penalty(old + delta) - self._ddt_penalty(old)
+
+    def swap(self, i: int, j: int):
+        """Обмінює значення S[i] та S[j] і оновлює таблиці та оцінку."""
+        sbox = self.sbox
+        affected = [None] + [{i, i ^ a, j, j ^ a} for a in range(1, self.size)]
+        self._update_ddt(affected, -1)  # Прибираємо старі внески
+
+        # Доданки спектра змінюються лише для x = i та x = j і лише там, де змінюється парність b·S(x)
+        for x, old_value, new_value in ((i, sbox[i], sbox[j]), (j, sbox[j], sbox[i])):
+            changed = [b for b in range(1, self.size) if PARITY[b & old_value] != PARITY[b & new_value]]
+            for a in range(self.size):
+                row = self.walsh[a]
+                sign = 1 - 2 * PARITY[a & x]
+                for b in changed:
+                    old = row[b]
+                    new = old + 2 * sign * (1 - 2 * PARITY[b & new_value])  # Доданок змінює знак: різниця ±2
+                    row[b] = new
+                    self.cost += self._walsh_penalty(new) - self._walsh_penalty(old)
+
+        self.fixed_points -= (sbox[i] == i) + (sbox[j] == j)
+        sbox[i], sbox[j] = sbox[j], sbox[i]
+        self.fixed_points += (sbox[i] == i) + (sbox[j] == j)
+        self.cost += self.fixed_penalty * ((sbox[i] == i) + (sbox[j] == j) - (sbox[j] == i) - (sbox[i] == j))
+        self._update_ddt(affected, 1)  # Додаємо нові внески
+
+def _search_sbox(bits: int, max_uniformity: int, min_nonlinearity: int, allow_fixed_points: bool,
+                 seed: int, max_iterations: int, patience: int):
+    """
+    Шукає таблицю підстановки локальним пошуком з обмінами. Виконується в робочому процесі.
+
+    :return: Пара (таблиця або None, кількість виконаних обмінів).
+    """
+    rng = random.Random(seed)  # Відтворювана послідовність для цього завдання
+    size = 1 << bits
+    values = list(range(size))
+    rng.shuffle(values)
+    score = IncrementalSBoxScore(values, max_uniformity, min_nonlinearity, allow_fixed_points)
+    best, stale = score.cost, 0
+    for iteration in range(max_iterations):
+        if score.cost == 0:
+            return score.sbox, iteration
+        i, j = rng.sample(range(size), 2)
+        previous = score.cost
+        score.swap(i, j)
+        if score.cost > previous and rng.random() >= ACCEPT_WORSE:
+            score.swap(i, j)  # Відкидаємо погіршення
+        if score.cost < best:
+            best, stale = score.cost, 0
+        else:
+            stale += 1
+        if stale > patience:
+            # Рання відмова: пошук застряг, починаємо з нової випадкової таблиці
+            rng.shuffle(values)
+            score = IncrementalSBoxScore(values, max_uniformity, min_nonlinearity, allow_fixed_points)
+            best, stale = score.cost, 0
+    return (score.sbox if score.cost == 0 else None), max_iterations
+
+def _run_tasks(function, tasks, workers: int):
+    """
+    Виконує завдання пошуку пакетами по workers і повертає перший успішний результат за порядком завдань,
+    тож результат не залежить від того, який процес завершився першим.
+
+    :return: Пара (індекс завдання, результат) або (None, None).
+    """
+    if workers == 1:
+        for index, task in enumerate(tasks):
+            result = function(*task)
+            if result[0] is not None:
+                return index, result
+        return None, None
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(tasks), workers):
+            batch = tasks[start:start + workers]
+            results = list(executor.map(function, *zip(*batch)))
+            for offset, result in enumerate(results):
+                if result[0] is not None:
+                    return start + offset, result
+    return None, None
+
+def generate_sbox(bits: int = 4, max_uniformity: int = 4, min_nonlinearity: int = 4, allow_fixed_points: bool = False,
+                  seed=None, workers: int = 1, tasks: int = 64, max_iterations: int = DEFAULT_MAX_ITERATIONS,
+                  patience: int = DEFAULT_PATIENCE):
+    """
+    Шукає таблицю підстановки з заданою якістю.
+
+    :param bits: Розмір входу таблиці в бітах (4 для ConstantTable).
+    :param max_uniformity: Найбільша допустима диференціальна рівномірність.
+    :param min_nonlinearity: Найменша допустима нелінійність.
+    :param allow_fixed_points: Чи допускаються нерухомі точки.
+    :param seed: Початкове значення для відтворюваного пошуку. Якщо не вказано, береться з модуля secrets.
+    :param workers: Кількість процесів (0 або None - за кількістю ядер).
+    :param tasks: Найбільша кількість незалежних завдань пошуку з власними похідними початковими значеннями.
+    :return: Словник з таблицею, початковим значенням, номером завдання, кількістю обмінів і показниками
+             або None, якщо таблицю не знайдено.
+    """
+    seed = secrets.randbits(64) if seed is None else seed
+    master = random.Random(seed)
+    task_list = [(bits, max_uniformity, min_nonlinearity, allow_fixed_points, master.getrandbits(64),
+                  max_iterations, patience) for _ in range(tasks)]
+    index, result = _run_tasks(_search_sbox, task_list, workers or os.cpu_count() or 1)
+    if result is None:
+        return None
+    sbox, iterations = result
+    return {"values": sbox, "seed": seed, "task": index, "iterations": iterations, "metrics": analyze_sbox(sbox)}
+
+def _permutations(width: int, allow_fixed_points: bool, balanced: bool):
+    """
+    Перебирає перестановки бітів з відсіканням гілок: нерухомі точки та незбалансовані переходи між
+    тетрадами відкидаються одразу, а не після побудови всієї перестановки.
+    """
+    half = width // 2
+    targets = [None] * width
+    used = [False] * width
+    crossings = [0, 0]  # Кількість бітів молодшої та старшої тетради, які переходять в іншу тетраду
+
+    def extend(position):
+        if position == width:
+            yield list(targets)
+            return
+        nibble = position // half
+        for target in range(width):
+            if used[target] or (not allow_fixed_points and target == position):
+                continue
+            crosses = target // half != nibble
+            if balanced:
+                placed = position - nibble * half  # Скільки бітів цієї тетради вже розміщено
+                count = crossings[nibble] + crosses
+                # Половина бітів кожної тетради має перейти в іншу тетраду, а половина - залишитися
+                if count > half // 2 or (placed + 1 - count) > half - half // 2:
+                    continue
+            used[target] = True
+            targets[position] = target
+            crossings[nibble] += crosses
+            yield from extend(position + 1)
+            crossings[nibble] -= crosses
+            used[target] = False
+
+    return extend(0)
+
+def generate_permutation(allow_fixed_points: bool = False, balanced: bool = True, seed=None):
+    """
+    Обирає формулу перестановки з 8 бітів серед усіх 8! варіантів, які відповідають вимогам.
+
+    :param allow_fixed_points: Чи допускаються біти, які залишаються на місці.
+    :param balanced: Вимагати, щоб рівно половина бітів кожної тетради переходила в іншу тетраду.
+    :param seed: Початкове значення для відтворюваного вибору. Якщо не вказано, береться з модуля secrets.
+    :return: Словник з перестановкою, початковим значенням, кількістю кандидатів і показниками або None.
+    """
+    seed = secrets.randbits(64) if seed is None else seed
+    candidates = list(_permutations(8, allow_fixed_points, balanced))
+    if not candidates:
+        return None
+    permutation = random.Random(seed).choice(candidates)
+    return {"values": permutation, "seed": seed, "candidates": len(candidates),
+            "metrics": analyze_permutation(permutation)}
+
+def build_arg_parser():
+    """Створює розбирач аргументів командного рядка."""
+    parser = argparse.ArgumentParser(description="Пошук якісних таблиць констант та формул перестановки.")
+    parser.add_argument("--sbox-out", help="Файл JSON для знайденої таблиці констант")
+    parser.add_argument("--pbox-out", help="Файл JSON для знайденої формули перестановки")
+    parser.add_argument("--max-uniformity", type=int, default=4, help="Найбільша диференціальна рівномірність")
+    parser.add_argument("--min-nonlinearity", type=int, default=4, help="Найменша нелінійність")
+    parser.add_argument("--allow-fixed-points", action="store_true", help="Допускати нерухомі точки")
+    parser.add_argument("--seed", type=int, help="Початкове значення (за замовчуванням з модуля secrets)")
+    parser.add_argument("--workers", type=int, default=1, help="Кількість процесів (0 - за кількістю ядер)")
+    parser.add_argument("--tasks", type=int, default=64, help="Кількість незалежних завдань пошуку")
+    add_profile_argument(parser)
+    return parser
+
+def main(argv=None) -> int:
+    """Точка входу командного рядка: виводить результат у форматі JSON та за потреби зберігає ключ."""
+    args = build_arg_parser().parse_args(argv)
+    with profiling(args.profile):
+        return _run_command(args)
+
+def _save_json(path: str, data) -> bool:
+    """Записує ключ у файл JSON; помилку виводить у stderr, щоб stdout лишався чистим JSON. Повертає успіх."""
+    try:
+        with open(path, "w") as f:
+            json.dump(data, f)
+    except OSError as error:
+        print(f"Не вдалося зберегти {path}: {error}", file=sys.stderr)
+        return False
+    return True
+
+def _run_command(args) -> int:
+    """Виконує команду з розібраними аргументами."""
+    for path in (args.sbox_out, args.pbox_out):
+        if path and not path.endswith(".json"):
+            print(f"Шлях {path} повинен закінчуватись на '.json'.", file=sys.stderr)
+            return 2
+    sbox = generate_sbox(4, args.max_uniformity, args.min_nonlinearity, args.allow_fixed_points,
+                         args.seed, args.workers, args.tasks)
+    permutation = generate_permutation(args.allow_fixed_points, seed=args.seed)
+    json.dump({"s_box": sbox, "permutation": permutation}, sys.stdout, indent=2)
+    print()
+    if sbox is None or permutation is None:
+        print("Не вдалося знайти ключ із заданою якістю.", file=sys.stderr)
+        return 1
+    # Формат файлів той самий, що в ConstantTable.save_constants та PermutationFormula.save_permutation,
+    # але без їхніх повідомлень у stdout. Конструктори перевіряють, що ключ коректний.
+    if args.sbox_out and not _save_json(args.sbox_out, {"constants": dict(
+            ConstantTable(dict(enumerate(sbox["values"]))).constants)}):
+        return 1
+    if args.pbox_out and not _save_json(args.pbox_out, {"permutation": list(
+            PermutationFormula(permutation["values"]).permutation_values)}):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
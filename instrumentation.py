@@ -0,0 +1,211 @@
+import cProfile  # Імпортуємо профілювальник для параметра --profile.
+import pstats  # Імпортуємо модуль для зведення результатів профілювання.
+import sys     # Імпортуємо модуль для стандартних потоків.
+import threading  # Імпортуємо модуль для блокування лічильників.
+import time    # Імпортуємо модуль для вимірювання часу етапів.
+from bisect import bisect_left  # Імпортуємо двійковий пошук кошика гістограми.
+from contextlib import contextmanager  # Імпортуємо декоратор контекстних менеджерів.
+
+# Верхні межі кошиків гістограми затримок у секундах: від 1 мкс до ~16 с з кроком 2×.
+HISTOGRAM_BOUNDS = tuple(1e-6 * 2 ** i for i in range(25))
+
+# Кількість рядків cProfile у зведеній таблиці.
+PROFILE_LIMIT = 20
+
+# Активний Recorder. None означає, що інструментування вимкнено: гарячі шляхи перевіряють лише це значення.
+recorder = None
+
+class Hook:
+    """
+    Інтерфейс передачі показників у зовнішню систему метрик.
+
+    Підклас перевизначає потрібні методи; методи за замовчуванням нічого не роблять. Методи викликаються
+    з потоку, який виконав операцію, тож повільні системи метрик слід буферизувати в самому хуку.
+    """
+
+    def count(self, name: str, value: int):
+        """Збільшення лічильника name на value."""
+
+    def timing(self, stage: str, seconds: float):
+        """Час виконання одного етапу (read, transform, write, s, p, compile, key_load)."""
+
+    def observe(self, name: str, seconds: float):
+        """Одне значення затримки для гістограми name."""
+
+class LatencyHistogram:
+    """Гістограма затримок з кошиками, межі яких зростають удвічі."""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Останній кошик - значення, більші за всі межі
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        """Додає одне значення."""
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Повертає верхню межу кошика, в якому лежить перцентиль fraction (не більшу за максимум)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        """Повертає кількість, середнє, p50, p99 та максимум у секундах."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+class Recorder:
+    """
+    Збирач показників: лічильники (виклики, байти на вході та виході), сумарний час етапів і гістограми затримок.
+
+    Показники одночасно передаються всім хукам. Якщо split_stages=True, побайтові шифри під час запису
+    виконують S-блок і P-блок окремими проходами, щоб виміряти їхній час окремо; інакше обидва блоки
+    вимірюються як один етап transform скомпільованої таблиці.
+    """
+
+    def __init__(self, hooks=(), split_stages: bool = False):
+        self.hooks = list(hooks)
+        self.split_stages = split_stages
+        self.counters = {}
+        self.timings = {}      # Етап -> [кількість, сумарний час у секундах]
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1):
+        """Збільшує лічильник name на value."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        for hook in self.hooks:
+            hook.count(name, value)
+
+    def timing(self, stage: str, seconds: float):
+        """Додає час одного виконання етапу stage."""
+        with self._lock:
+            entry = self.timings.setdefault(stage, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+        for hook in self.hooks:
+            hook.timing(stage, seconds)
+
+    def observe(self, name: str, seconds: float):
+        """Додає значення затримки до гістограми name."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.add(seconds)
+        for hook in self.hooks:
+            hook.observe(name, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Вимірює час виконання блоку with як етап name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(name, time.perf_counter() - start)
+
+    def operation(self, name: str, bytes_in: int, bytes_out: int):
+        """Записує один виклик операції name з кількістю байтів на вході та виході."""
+        self.count(f"{name}.calls")
+        self.count(f"{name}.bytes_in", bytes_in)
+        self.count(f"{name}.bytes_out", bytes_out)
+
+    def to_dict(self) -> dict:
+        """Повертає знімок усіх показників."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {stage: {"calls": calls, "seconds": seconds}
+                            for stage, (calls, seconds) in self.timings.items()},
+                "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            }
+
+    def summary(self) -> str:
+        """Повертає зведену таблицю показників."""
+        data = self.to_dict()
+        lines = []
+        total = sum(item["seconds"] for item in data["timings"].values())
+        if data["timings"]:
+            lines.append(f"{'Етап':<16}{'Викликів':>12}{'Час, с':>14}{'Частка':>10}")
+            for stage, item in sorted(data["timings"].items(), key=lambda pair: -pair[1]["seconds"]):
+                share = item["seconds"] / total if total else 0.0
+                lines.append(f"{stage:<16}{item['calls']:>12}{item['seconds']:>14.6f}{share:>10.1%}")
+        if data["counters"]:
+            lines.append(f"{'Лічильник':<28}{'Значення':>16}")
+            for name, value in sorted(data["counters"].items()):
+                lines.append(f"{name:<28}{value:>16}")
+        for name, histogram in sorted(data["histograms"].items()):
+            lines.append(f"{name}: {histogram['count']} значень, p50 {histogram['p50'] * 1e3:.3f} мс, "
+                         f"p99 {histogram['p99'] * 1e3:.3f} мс, max {histogram['max'] * 1e3:.3f} мс")
+        return "\n".join(lines) if lines else "Показників не записано."
+
+def enable(hooks=(), split_stages: bool = False) -> Recorder:
+    """Вмикає інструментування з новим Recorder і повертає його."""
+    global recorder
+    recorder = Recorder(hooks, split_stages)
+    return recorder
+
+def disable():
+    """Вимикає інструментування і повертає Recorder, який був активним (або None)."""
+    global recorder
+    previous, recorder = recorder, None
+    return previous
+
+@contextmanager
+def recording(hooks=(), split_stages: bool = False):
+    """Вмикає інструментування на час блоку with і повертає Recorder."""
+    global recorder
+    previous = recorder
+    recorder = active = Recorder(hooks, split_stages)
+    try:
+        yield active
+    finally:
+        recorder = previous
+
+def add_profile_argument(parser):
+    """Додає до розбирача аргументів параметр --profile."""
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Записати дамп cProfile/pstats у файл і вивести зведену таблицю в stderr")
+
+@contextmanager
+def profiling(path=None, log=None, limit: int = PROFILE_LIMIT):
+    """
+    Профілює блок with: вмикає cProfile та інструментування з split_stages, а після завершення зберігає дамп
+    pstats у path і виводить у log (за замовчуванням stderr) показники Recorder, зокрема окремий час S-блоку
+    та P-блоку, і найдорожчі функції.
+
+    Якщо path не вказано, нічого не вмикає і повертає None.
+    """
+    if path is None:
+        yield None
+        return
+    log = log or sys.stderr
+    profiler = cProfile.Profile()
+    with recording(split_stages=True) as active:
+        profiler.enable()
+        try:
+            yield active
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            print(active.summary(), file=log)
+            pstats.Stats(profiler, stream=log).sort_stats("cumulative").print_stats(limit)
@@ -0,0 +1,364 @@
+import os      # Імпортуємо модуль для кількості ядер та генерації вектора ініціалізації.
+from concurrent.futures import ProcessPoolExecutor  # Імпортуємо пул процесів для паралельних режимів.
+
+ECB = "ecb"  # Режим простої заміни: кожен блок шифрується окремо
+CBC = "cbc"  # Режим зчеплення блоків: кожен блок перед шифруванням XOR-иться з попереднім шифротекстом
+CTR = "ctr"  # Режим лічильника: дані XOR-яться з зашифрованими значеннями лічильника
+MODES = (ECB, CBC, CTR)
+
+# Кількість блоків лічильника, які шифруються за один виклик encrypt_bytes.
+KEYSTREAM_BATCH_BLOCKS = 1 << 16
+
+# Найменший розмір блоку для CBC та CTR. З однобайтовим блоком лічильник і вектор ініціалізації мають лише
+# 256 значень: ключовий потік CTR повторюється кожні 256 байтів, тобто стає XOR з повторюваним ключем.
+MIN_CHAINING_BLOCK_BYTES = 8
+
+# Розмір блоку читання для потокових encrypt_stream/decrypt_stream (1 МіБ).
+STREAM_CHUNK_SIZE = 1 << 20
+
+def _xor_bytes(left, right) -> bytes:
+    """Виконує XOR двох послідовностей однакової довжини через великі цілі числа (без циклу по байтах)."""
+    length = len(left)
+    return (int.from_bytes(left, 'little') ^ int.from_bytes(right, 'little')).to_bytes(length, 'little')
+
+def pad(data, block_bytes: int) -> bytes:
+    """Доповнює дані за схемою PKCS#7 до довжини, кратної розміру блоку."""
+    padding = block_bytes - len(data) % block_bytes
+    return bytes(data) + bytes([padding]) * padding
+
+def unpad(data, block_bytes: int) -> bytes:
+    """
+    Видаляє доповнення PKCS#7.
+
+    :raises ValueError: Якщо доповнення некоректне.
+    """
+    if not data or len(data) % block_bytes:
+        raise ValueError("Довжина зашифрованих даних має бути кратною розміру блоку.")
+    padding = data[-1]
+    if not 1 <= padding <= block_bytes or data[-padding:] != bytes([padding]) * padding:
+        raise ValueError("Некоректне доповнення PKCS#7.")
+    return bytes(data[:-padding])
+
+def generate_iv(cipher) -> bytes:
+    """Генерує випадковий вектор ініціалізації (або початкове значення лічильника) розміром з блок шифру."""
+    return os.urandom(cipher.block_bytes)
+
+def counter_blocks(start: int, count: int, block_bytes: int) -> bytes:
+    """
+    Повертає count послідовних блоків лічильника, починаючи зі значення start (за модулем 2^(8·block_bytes)).
+
+    Блоки записуються у порядку big-endian, тож молодший байт лічильника - останній байт блоку.
+    """
+    mask = (1 << (8 * block_bytes)) - 1
+    return b''.join([((start + i) & mask).to_bytes(block_bytes, 'big') for i in range(count)])
+
+def ctr_keystream(cipher, start: int, count: int) -> bytes:
+    """Шифрує count блоків лічильника, починаючи зі значення start, пакетами по KEYSTREAM_BATCH_BLOCKS."""
+    parts = []
+    for offset in range(0, count, KEYSTREAM_BATCH_BLOCKS):
+        batch = min(KEYSTREAM_BATCH_BLOCKS, count - offset)
+        parts.append(cipher.encrypt_bytes(counter_blocks(start + offset, batch, cipher.block_bytes)))
+    return b''.join(parts)
+
+def _cbc_encrypt_blocks(cipher, data, previous: bytes):
+    """
+    Шифрує цілі блоки в режимі CBC. Повертає (шифротекст, останній блок шифротексту).
+
+    Шифрування CBC послідовне за своєю природою: кожен блок залежить від попереднього шифротексту.
+    """
+    block_bytes = cipher.block_bytes
+    parts = []
+    for offset in range(0, len(data), block_bytes):
+        previous = cipher.encrypt_bytes(_xor_bytes(data[offset:offset + block_bytes], previous))
+        parts.append(previous)
+    return b''.join(parts), previous
+
+def _cbc_decrypt_blocks(cipher, data, previous: bytes, pool=None):
+    """
+    Дешифрує цілі блоки в режимі CBC. Повертає (відкритий текст, останній блок шифротексту).
+
+    Кожен блок відкритого тексту залежить лише від двох блоків шифротексту, тому всі блоки дешифруються
+    одним масовим викликом (або паралельно в пулі), а потім XOR-яться із зсунутим шифротекстом.
+    """
+    if not data:
+        return b'', previous
+    data = bytes(data)
+    decrypted = pool.apply('decrypt_bytes', data) if pool is not None else cipher.decrypt_bytes(data)
+    chained = previous + data[:-cipher.block_bytes]  # Попередній блок шифротексту для кожного блоку
+    return _xor_bytes(decrypted, chained), data[-cipher.block_bytes:]
+
+# Шифр у робочому процесі; передається один раз під час запуску процесу.
+_worker_cipher = None
+
+def _init_worker(cipher):
+    """Ініціалізує робочий процес, зберігаючи шифр."""
+    global _worker_cipher
+    _worker_cipher = cipher
+
+def _apply_segment(method: str, data) -> bytes:
+    """Застосовує метод шифру до частини даних. Виконується в робочому процесі."""
+    return getattr(_worker_cipher, method)(data)
+
+def _keystream_segment(start: int, count: int) -> bytes:
+    """Генерує частину ключового потоку CTR. Виконується в робочому процесі."""
+    return ctr_keystream(_worker_cipher, start, count)
+
+class BlockPool:
+    """Пул процесів, який ділить дані по межах блоків і обробляє частини паралельно у детермінованому порядку."""
+
+    def __init__(self, cipher, workers=None):
+        """
+        Ініціалізація пулу.
+
+        :param cipher: Шифр з атрибутом block_bytes та методами encrypt_bytes/decrypt_bytes; передається
+                       кожному процесу один раз.
+        :param workers: Кількість процесів. Якщо не вказано, дорівнює кількості ядер.
+        """
+        self.block_bytes = cipher.block_bytes
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(cipher,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Зупиняє робочі процеси."""
+        self._executor.shutdown()
+
+    def _segments(self, total_blocks: int):
+        """Ділить total_blocks блоків на частини: по кілька на кожен процес для рівномірного навантаження."""
+        per_segment = max(1, -(-total_blocks // (self.workers * 4)))
+        return [(start, min(per_segment, total_blocks - start)) for start in range(0, total_blocks, per_segment)]
+
+    def apply(self, method: str, data) -> bytes:
+        """Паралельно застосовує метод шифру ('encrypt_bytes' або 'decrypt_bytes') до цілих блоків."""
+        block_bytes = self.block_bytes
+        segments = [data[start * block_bytes:(start + count) * block_bytes]
+                    for start, count in self._segments(len(data) // block_bytes)]
+        return b''.join(self._executor.map(_apply_segment, [method] * len(segments), segments))
+
+    def keystream(self, start: int, count: int) -> bytes:
+        """Паралельно генерує count блоків ключового потоку CTR, починаючи зі значення лічильника start."""
+        segments = self._segments(count)
+        return b''.join(self._executor.map(_keystream_segment,
+                                           [start + offset for offset, _ in segments],
+                                           [length for _, length in segments]))
+
+def _check_iv(cipher, mode: str, iv):
+    """Перевіряє режим і вектор ініціалізації та повертає його як bytes."""
+    if mode not in MODES:
+        raise ValueError(f"Невідомий режим {mode!r}; підтримуються {MODES}.")
+    if mode == ECB:
+        return b''
+    if cipher.block_bytes < MIN_CHAINING_BLOCK_BYTES:
+        raise ValueError(f"Режим {mode} потребує блоку щонайменше {MIN_CHAINING_BLOCK_BYTES} байтів: з блоком "
+                         f"{cipher.block_bytes} байт лічильник і вектор ініціалізації повторюються кожні 256 блоків. "
+                         f"Використовуйте WideBlockCipher.")
+    if iv is None or len(iv) != cipher.block_bytes:
+        raise ValueError(f"Для режиму {mode} потрібен вектор ініціалізації довжиною {cipher.block_bytes} байт.")
+    return bytes(iv)
+
+class _StreamingMode:
+    """Спільна частина потокових шифрувальника та дешифрувальника."""
+
+    def __init__(self, cipher, mode: str, iv=None):
+        """
+        Ініціалізація потокового об'єкта.
+
+        :param cipher: Шифр з атрибутом block_bytes та методами encrypt_bytes/decrypt_bytes.
+        :param mode: Режим: ECB, CBC або CTR.
+        :param iv: Вектор ініціалізації (CBC) або початкове значення лічильника (CTR) довжиною з блок.
+        """
+        self.cipher = cipher
+        self.mode = mode
+        self._previous = _check_iv(cipher, mode, iv)  # Попередній блок шифротексту для CBC
+        self._counter = int.from_bytes(self._previous, 'big')  # Наступне значення лічильника для CTR
+        self._keystream = b''  # Невикористаний залишок ключового потоку CTR
+        self._pending = b''    # Неповний блок, перенесений з попереднього виклику update
+        self._finalized = False
+
+    def _ctr_update(self, data) -> bytes:
+        """XOR-ить дані з ключовим потоком, зберігаючи невикористаний залишок для наступного виклику."""
+        needed = len(data) - len(self._keystream)
+        if needed > 0:
+            blocks = -(-needed // self.cipher.block_bytes)
+            self._keystream += ctr_keystream(self.cipher, self._counter, blocks)
+            self._counter += blocks
+        keystream, self._keystream = self._keystream[:len(data)], self._keystream[len(data):]
+        return _xor_bytes(data, keystream)
+
+    def _split_blocks(self, data, hold_back: bool = False) -> bytes:
+        """
+        Повертає цілі блоки з перенесеного залишку та нових даних, зберігаючи неповний хвіст до наступного виклику.
+
+        Копіюється лише перенесений залишок (не більший за блок) разом із готовою частиною нових даних, а не
+        весь накопичений вхід.
+
+        :param hold_back: Утримати останній повний блок (потрібно дешифрувальнику для зняття доповнення).
+        """
+        block_bytes = self.cipher.block_bytes
+        data = memoryview(data).cast('B')
+        total = len(self._pending) + len(data)
+        keep = total % block_bytes
+        if hold_back and not keep and total:
+            keep = block_bytes  # Останній повний блок може містити доповнення
+        ready = total - keep
+        if not ready:
+            self._pending += bytes(data)  # Блок ще не заповнений
+            return b''
+        from_data = ready - len(self._pending)  # Залишок завжди коротший за готову частину
+        blocks = b''.join((self._pending, data[:from_data]))
+        self._pending = bytes(data[from_data:])
+        return blocks
+
+    def _check_active(self):
+        """Перевіряє, що finalize ще не викликався."""
+        if self._finalized:
+            raise ValueError("Метод finalize уже був викликаний.")
+
+class Encryptor(_StreamingMode):
+    """Потоковий шифрувальник: update() повертає готовий шифротекст, finalize() - останній (доповнений) блок."""
+
+    def update(self, data) -> bytes:
+        """Шифрує черговий фрагмент даних будь-якої довжини."""
+        self._check_active()
+        if self.mode == CTR:
+            return self._ctr_update(data)
+        blocks = self._split_blocks(data)
+        if self.mode == ECB:
+            return self.cipher.encrypt_bytes(blocks) if blocks else b''
+        output, self._previous = _cbc_encrypt_blocks(self.cipher, blocks, self._previous)
+        return output
+
+    def finalize(self) -> bytes:
+        """Завершує шифрування: доповнює та шифрує залишок (для ECB та CBC)."""
+        self._check_active()
+        self._finalized = True
+        if self.mode == CTR:
+            return b''
+        last = pad(self._pending, self.cipher.block_bytes)
+        self._pending = b''
+        if self.mode == ECB:
+            return self.cipher.encrypt_bytes(last)
+        return _cbc_encrypt_blocks(self.cipher, last, self._previous)[0]
+
+class Decryptor(_StreamingMode):
+    """Потоковий дешифрувальник: останній блок утримується до finalize(), який знімає доповнення."""
+
+    def update(self, data) -> bytes:
+        """Дешифрує черговий фрагмент даних будь-якої довжини."""
+        self._check_active()
+        if self.mode == CTR:
+            return self._ctr_update(data)
+        blocks = self._split_blocks(data, hold_back=True)
+        if self.mode == ECB:
+            return self.cipher.decrypt_bytes(blocks) if blocks else b''
+        output, self._previous = _cbc_decrypt_blocks(self.cipher, blocks, self._previous)
+        return output
+
+    def finalize(self) -> bytes:
+        """
+        Завершує дешифрування: дешифрує утриманий блок та знімає доповнення (для ECB та CBC).
+
+        :raises ValueError: Якщо довжина даних не кратна блоку або доповнення некоректне.
+        """
+        self._check_active()
+        self._finalized = True
+        if self.mode == CTR:
+            return b''
+        last, self._pending = self._pending, b''
+        if len(last) != self.cipher.block_bytes:
+            raise ValueError("Довжина зашифрованих даних має бути кратною розміру блоку.")
+        if self.mode == ECB:
+            return unpad(self.cipher.decrypt_bytes(last), self.cipher.block_bytes)
+        return unpad(_cbc_decrypt_blocks(self.cipher, last, self._previous)[0], self.cipher.block_bytes)
+
+def encrypt(cipher, mode: str, data, iv=None, workers: int = 1) -> bytes:
+    """
+    Шифрує дані повністю в одному з режимів.
+
+    :param cipher: Шифр з атрибутом block_bytes та методами encrypt_bytes/decrypt_bytes.
+    :param mode: Режим: ECB, CBC або CTR.
+    :param iv: Вектор ініціалізації (CBC) або початкове значення лічильника (CTR) довжиною з блок.
+    :param workers: Кількість процесів для ECB та генерації ключового потоку CTR (шифрування CBC послідовне).
+    """
+    iv = _check_iv(cipher, mode, iv)
+    if workers == 1 or mode == CBC:
+        encryptor = Encryptor(cipher, mode, iv)
+        return encryptor.update(data) + encryptor.finalize()
+    with BlockPool(cipher, workers or None) as pool:
+        if mode == ECB:
+            return pool.apply('encrypt_bytes', pad(data, cipher.block_bytes))
+        blocks = -(-len(data) // cipher.block_bytes)
+        return _xor_bytes(data, pool.keystream(int.from_bytes(iv, 'big'), blocks)[:len(data)])
+
+def decrypt(cipher, mode: str, data, iv=None, workers: int = 1) -> bytes:
+    """
+    Дешифрує дані повністю в одному з режимів.
+
+    :param workers: Кількість процесів; у всіх трьох режимах дешифрування розпаралелюється.
+    :raises ValueError: Якщо довжина даних або доповнення некоректні.
+    """
+    iv = _check_iv(cipher, mode, iv)
+    if workers == 1:
+        decryptor = Decryptor(cipher, mode, iv)
+        return decryptor.update(data) + decryptor.finalize()
+    data = bytes(data)
+    if mode != CTR and (not data or len(data) % cipher.block_bytes):
+        raise ValueError("Довжина зашифрованих даних має бути кратною розміру блоку.")
+    with BlockPool(cipher, workers or None) as pool:
+        if mode == ECB:
+            return unpad(pool.apply('decrypt_bytes', data), cipher.block_bytes)
+        if mode == CBC:
+            return unpad(_cbc_decrypt_blocks(cipher, data, iv, pool)[0], cipher.block_bytes)
+        blocks = -(-len(data) // cipher.block_bytes)
+        return _xor_bytes(data, pool.keystream(int.from_bytes(iv, 'big'), blocks)[:len(data)])
+
+def encrypt_stream(cipher, mode: str, src, dst, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+    """
+    Шифрує потік у режимі mode блоками по chunk_size байтів.
+
+    Для CBC та CTR генерується випадковий вектор ініціалізації, який записується на початок вихідного потоку.
+
+    :return: Кількість прочитаних байтів.
+    """
+    iv = generate_iv(cipher) if mode != ECB else None
+    encryptor = Encryptor(cipher, mode, iv)
+    if iv is not None:
+        dst.write(iv)
+    total = 0
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(encryptor.update(chunk))
+        total += len(chunk)
+    dst.write(encryptor.finalize())
+    return total
+
+def decrypt_stream(cipher, mode: str, src, dst, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+    """
+    Дешифрує потік, створений encrypt_stream, блоками по chunk_size байтів.
+
+    :return: Кількість прочитаних байтів (разом із вектором ініціалізації).
+    :raises ValueError: Якщо потік коротший за вектор ініціалізації або доповнення некоректне.
+    """
+    iv = None
+    if mode != ECB:
+        _check_iv(cipher, mode, bytes(cipher.block_bytes))  # Перевіряємо режим до читання потоку
+        iv = src.read(cipher.block_bytes)
+        if len(iv) != cipher.block_bytes:
+            raise ValueError("Потік коротший за вектор ініціалізації.")
+    decryptor = Decryptor(cipher, mode, iv)
+    total = len(iv or b'')
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(decryptor.update(chunk))
+        total += len(chunk)
+    dst.write(decryptor.finalize())
+    return total
@@ -0,0 +1,244 @@
+import itertools  # Імпортуємо лічильник поколінь завантажень.
+import os      # Імпортуємо модуль для роботи з файловою системою.
+import threading  # Імпортуємо модуль для блокування спільного кешу.
+import time    # Імпортуємо модуль для часу життя записів кешу.
+from collections import OrderedDict  # Імпортуємо впорядкований словник для порядку LRU.
+from concurrent.futures import Future  # Імпортуємо результат завантаження, на який чекають інші потоки.
+
+from main import load_key_snapshot
+
+# Кількість скомпільованих шифрів, які реєстр тримає в пам'яті за замовчуванням.
+DEFAULT_REGISTRY_SIZE = 1024
+
+# Розширення файлів ключів у порядку пошуку: спершу двійковий формат, потім JSON.
+REGISTRY_EXTENSIONS = (".spk", ".json")
+
+class _Entry:
+    """Запис кешу: шифр, його скомпільовані таблиці та момент, після якого запис застаріває."""
+
+    __slots__ = ("cipher", "encrypt_table", "decrypt_table", "expires")
+
+    def __init__(self, cipher, expires):
+        self.cipher = cipher
+        self.expires = expires
+        # Для побайтових шифрів таблиці будуються один раз, тож шифрування зводиться до bytes.translate
+        if cipher.block_bytes == 1:
+            self.encrypt_table, self.decrypt_table = cipher.compile_tables()
+        else:
+            self.encrypt_table = self.decrypt_table = None
+
+class _Load:
+    """Завантаження ключа, що виконується: результат для потоків, які чекають, і покоління завантаження."""
+
+    __slots__ = ("future", "generation")
+
+    def __init__(self, generation: int):
+        self.future = Future()
+        self.generation = generation
+
+class CipherRegistry:
+    """
+    Потокобезпечний реєстр скомпільованих шифрів за ідентифікаторами ключів.
+
+    Шифр завантажується з каталогу ключів під час першого звернення (файл <ідентифікатор>.spk або
+    <ідентифікатор>.json) і зберігається в кеші з витісненням давно не використаних записів (LRU) та,
+    за бажанням, обмеженим часом життя (TTL). Одночасні звернення до ще не завантаженого ключа чекають на
+    одне спільне завантаження. Шифри, додані через register, за замовчуванням закріплені: вони не
+    застарівають і не витісняються, бо відновити їх з каталогу неможливо.
+    """
+
+    def __init__(self, key_dir=None, max_size: int = DEFAULT_REGISTRY_SIZE, ttl=None, loader=load_key_snapshot,
+                 clock=time.monotonic):
+        """
+        Ініціалізація реєстру.
+
+        :param key_dir: Каталог з файлами ключів. Без каталогу шифри додаються лише через register.
+        :param max_size: Найбільша кількість завантажених шифрів у кеші (закріплені записи не враховуються).
+        :param ttl: Час життя запису в секундах (None - без обмеження).
+        :param loader: Функція, яка завантажує шифр за шляхом до файлу ключа. За замовчуванням - незмінний
+                       CipherSnapshot (load_key_snapshot), яким потоки користуються без блокувань.
+        :param clock: Джерело монотонного часу в секундах.
+        """
+        if max_size <= 0:
+            raise ValueError("Розмір кешу має бути додатним.")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("Час життя запису має бути додатним.")
+        self.key_dir = key_dir
+        self.max_size = max_size
+        self.ttl = ttl
+        self.loader = loader
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._pinned = {}   # Закріплені записи: без TTL і без витіснення
+        self._loading = {}  # Ідентифікатор ключа -> _Load, що виконується
+        self._generations = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key_path(self, key_id: str) -> str:
+        """
+        Повертає шлях до файлу ключа з ідентифікатором key_id.
+
+        :raises ValueError: Якщо ідентифікатор некоректний або каталог ключів не задано.
+        :raises FileNotFoundError: Якщо файлу ключа немає.
+        """
+        if not key_id or key_id.startswith(".") or os.path.basename(key_id) != key_id:
+            raise ValueError(f"Некоректний ідентифікатор ключа: {key_id!r}.")
+        if self.key_dir is None:
+            raise ValueError("Каталог ключів не задано.")
+        for extension in REGISTRY_EXTENSIONS:
+            path = os.path.join(self.key_dir, key_id + extension)
+            if os.path.isfile(path):
+                return path
+        raise FileNotFoundError(f"Ключ {key_id!r} не знайдено в каталозі {self.key_dir}.")
+
+    def _expires(self):
+        """Повертає момент застарівання нового запису."""
+        return None if self.ttl is None else self.clock() + self.ttl
+
+    def _lookup(self, key_id: str):
+        """
+        Повертає запис з кешу або завантажує його з каталогу ключів.
+
+        Якщо ключ уже завантажується іншим потоком, чекає на те саме завантаження. Результат завантаження
+        потрапляє до кешу, лише якщо його покоління досі актуальне, тобто ключ не інвалідовано під час читання
+        файлу; інакше шифр повертається викликачеві, але застарілий запис не кешується.
+        """
+        with self._lock:
+            entry = self._pinned.get(key_id)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            entry = self._entries.get(key_id)
+            if entry is not None:
+                if entry.expires is None or entry.expires > self.clock():
+                    self._entries.move_to_end(key_id)
+                    self.hits += 1
+                    return entry
+                del self._entries[key_id]
+                self.expirations += 1
+            self.misses += 1
+            load = self._loading.get(key_id)
+            owner = load is None  # Перший потік завантажує ключ, решта чекають на його результат
+            if owner:
+                load = self._loading[key_id] = _Load(next(self._generations))
+        if not owner:
+            return load.future.result()
+        # Файл читається без блокування, щоб завантаження одного ключа не затримувало інші
+        try:
+            entry = _Entry(self.loader(self.key_path(key_id)), self._expires())
+        except BaseException as error:
+            with self._lock:
+                self._finish_load(key_id, load)
+            load.future.set_exception(error)
+            raise
+        with self._lock:
+            if self._finish_load(key_id, load):
+                self._store(key_id, entry)
+        load.future.set_result(entry)
+        return entry
+
+    def _finish_load(self, key_id: str, load) -> bool:
+        """
+        Знімає завершене завантаження з реєстру. Викликається під блокуванням.
+
+        :return: Чи актуальне покоління завантаження (ключ не інвалідовано й не замінено через register).
+        """
+        current = self._loading.get(key_id)
+        if current is None or current.generation != load.generation:
+            return False
+        del self._loading[key_id]
+        return True
+
+    def _store(self, key_id: str, entry):
+        """Додає запис до кешу та витісняє найдавніші записи. Викликається під блокуванням."""
+        self._entries[key_id] = entry
+        self._entries.move_to_end(key_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def register(self, key_id: str, cipher, pinned: bool = True):
+        """
+        Додає до кешу вже створений шифр (наприклад, ключ, якого немає в каталозі).
+
+        :param pinned: Закріпити запис: він не застаріває за TTL і не витісняється, доки його не видалить
+                       invalidate. Незакріплений запис поводиться як завантажений з каталогу.
+        """
+        entry = _Entry(cipher, None if pinned else self._expires())
+        with self._lock:
+            self._loading.pop(key_id, None)  # Завантаження, що виконується, не перезапише зареєстрований шифр
+            self._entries.pop(key_id, None)
+            self._pinned.pop(key_id, None)
+            if pinned:
+                self._pinned[key_id] = entry
+            else:
+                self._store(key_id, entry)
+
+    def get(self, key_id: str):
+        """
+        Повертає шифр з ідентифікатором key_id.
+
+        :raises ValueError: Якщо ідентифікатор або файл ключа некоректні.
+        :raises OSError: Якщо файл ключа не вдалося прочитати.
+        """
+        return self._lookup(key_id).cipher
+
+    def encrypt_bytes(self, key_id: str, data) -> bytes:
+        """Шифрує дані ключем key_id."""
+        entry = self._lookup(key_id)
+        if entry.encrypt_table is not None:
+            return bytes(data).translate(entry.encrypt_table)
+        return entry.cipher.encrypt_bytes(data)
+
+    def decrypt_bytes(self, key_id: str, data) -> bytes:
+        """Дешифрує дані ключем key_id."""
+        entry = self._lookup(key_id)
+        if entry.decrypt_table is not None:
+            return bytes(data).translate(entry.decrypt_table)
+        return entry.cipher.decrypt_bytes(data)
+
+    def invalidate(self, key_id=None):
+        """
+        Видаляє з кешу один ключ (наприклад, після його заміни у каталозі) або всі ключі, зокрема закріплені.
+
+        Завантаження, що виконуються, стають застарілими: їхні результати не потраплять до кешу, а наступне
+        звернення прочитає файл ключа заново.
+        """
+        with self._lock:
+            if key_id is None:
+                self._entries.clear()
+                self._pinned.clear()
+                self._loading.clear()
+            else:
+                self._entries.pop(key_id, None)
+                self._pinned.pop(key_id, None)
+                self._loading.pop(key_id, None)
+
+    def stats(self) -> dict:
+        """
+        Повертає лічильники звернень: hits, misses, evictions, expirations, поточний розмір кешу та кількість
+        закріплених записів у ньому.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries) + len(self._pinned),
+                "pinned": len(self._pinned),
+            }
+
+    def __contains__(self, key_id) -> bool:
+        """Перевіряє, чи є ключ у кеші, не змінюючи порядок LRU та лічильники."""
+        with self._lock:
+            return key_id in self._entries or key_id in self._pinned
+
+    def __len__(self) -> int:
+        """Повертає кількість шифрів у кеші."""
+        with self._lock:
+            return len(self._entries) + len(self._pinned)
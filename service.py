@@ -0,0 +1,419 @@
+import argparse  # Імпортуємо модуль для розбору аргументів командного рядка.
+import asyncio  # Імпортуємо модуль для асинхронного сервера та клієнта.
+import json    # Імпортуємо модуль для виводу результатів навантажувального тесту.
+import struct  # Імпортуємо модуль для заголовків протоколу.
+import sys     # Імпортуємо модуль для стандартних потоків.
+import time    # Імпортуємо модуль для вимірювання затримок.
+from concurrent.futures import ThreadPoolExecutor  # Імпортуємо пул потоків для великих завдань.
+
+from instrumentation import add_profile_argument, profiling
+from main import DEFAULT_CHUNK_SIZE
+from registry import CipherRegistry, DEFAULT_REGISTRY_SIZE
+
+# Протокол: запит - заголовок (операція, довжина ідентифікатора ключа, довжина даних), ідентифікатор ключа
+# в UTF-8 та дані; відповідь - заголовок (статус, довжина) та результат або текст помилки в UTF-8.
+# Запити одного з'єднання обробляються по черзі, відповіді надходять у тому ж порядку.
+REQUEST_HEADER = struct.Struct("!BHI")
+RESPONSE_HEADER = struct.Struct("!BI")
+OP_ENCRYPT = 1
+OP_DECRYPT = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7341
+
+# Запити, не більші за цей розмір, об'єднуються з одночасними запитами до того ж ключа в один пакет.
+DEFAULT_BATCH_THRESHOLD = 64 << 10
+
+# Пакет обробляється одразу, щойно сумарний розмір запитів у ньому досягає цього значення.
+MAX_BATCH_BYTES = 4 << 20
+
+class _Batch:
+    """Запити до одного ключа та однієї операції, які очікують на спільне перетворення."""
+
+    __slots__ = ("parts", "futures", "size", "timer")
+
+    def __init__(self):
+        self.parts = []
+        self.futures = []
+        self.size = 0
+        self.timer = None  # Відкладений виклик _flush для цього пакета
+
+class CipherService:
+    """
+    Асинхронний сервіс шифрування на локальному сокеті.
+
+    Малі одночасні запити до одного ключа об'єднуються в пакет і перетворюються одним викликом; великі дані
+    читаються, перетворюються в пулі потоків та відправляються частинами з очікуванням на drain, тож цикл подій
+    не блокується, а пам'ять не залежить від розміру запиту.
+    """
+
+    def __init__(self, registry, batch_threshold: int = DEFAULT_BATCH_THRESHOLD, batch_delay: float = 0.0,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, executor=None):
+        """
+        Ініціалізація сервісу.
+
+        :param registry: CipherRegistry, з якого беруться шифри за ідентифікаторами ключів.
+        :param batch_threshold: Найбільший розмір запиту, який потрапляє до пакета.
+        :param batch_delay: Час у секундах, протягом якого пакет збирає запити (0 - до наступної ітерації циклу).
+        :param chunk_size: Розмір частини для потокової обробки великих запитів.
+        :param executor: Пул для перетворення великих частин (за замовчуванням ThreadPoolExecutor).
+        """
+        if chunk_size <= 0:
+            raise ValueError("Розмір частини має бути додатним.")
+        self.registry = registry
+        self.batch_threshold = batch_threshold
+        self.batch_delay = batch_delay
+        self.chunk_size = chunk_size
+        self.executor = executor or ThreadPoolExecutor()
+        self._batches = {}
+        self._tasks = set()  # Завдання перетворення пакетів (посилання не дає збирачу сміття їх знищити)
+
+    def _function(self, op: int):
+        """Повертає метод реєстру для операції."""
+        if op == OP_ENCRYPT:
+            return self.registry.encrypt_bytes
+        if op == OP_DECRYPT:
+            return self.registry.decrypt_bytes
+        raise ValueError(f"Невідома операція: {op}.")
+
+    def _flush(self, key, batch):
+        """
+        Закриває пакет для нових запитів і запускає його перетворення в пулі.
+
+        Виклик для пакета, який уже не є поточним для key (його оброблено через перевищення MAX_BATCH_BYTES),
+        нічого не робить, тож застарілий таймер не закриє новіший пакет достроково.
+        """
+        if self._batches.get(key) is not batch:
+            return
+        del self._batches[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._run_batch(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, key, batch):
+        """Перетворює всі запити пакета одним викликом у пулі й повертає кожному запиту його частину."""
+        key_id, op = key
+        try:
+            # Перетворення (і ліниве завантаження ключа) виконується в пулі, щоб не зупиняти цикл подій
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._function(op), key_id, b''.join(batch.parts))
+        except Exception as error:  # Будь-яка помилка має завершити всі запити пакета, інакше клієнти зависнуть
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        offset = 0
+        for part, future in zip(batch.parts, batch.futures):
+            if not future.done():  # Клієнт міг від'єднатися, поки запит очікував
+                future.set_result(result[offset:offset + len(part)])
+            offset += len(part)
+
+    async def _transform_batched(self, key_id: str, op: int, payload: bytes) -> bytes:
+        """Додає малий запит до пакета та очікує на його результат."""
+        loop = asyncio.get_running_loop()
+        key = (key_id, op)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+            batch.timer = loop.call_later(self.batch_delay, self._flush, key, batch)
+        future = loop.create_future()
+        batch.parts.append(payload)
+        batch.futures.append(future)
+        batch.size += len(payload)
+        if batch.size >= MAX_BATCH_BYTES:
+            self._flush(key, batch)
+        return await future
+
+    async def _stream(self, reader, writer, key_id: str, op: int, length: int, block_bytes: int):
+        """
+        Читає великий запит частинами, перетворює їх у пулі та відправляє з урахуванням зворотного тиску.
+
+        Заголовок успішної відповіді відправляється до перетворення, тож про помилку посеред потоку вже не
+        можна повідомити відповіддю: з'єднання обривається, і клієнт отримує неповну відповідь.
+
+        :raises ConnectionAbortedError: Якщо перетворення частини завершилося помилкою.
+        """
+        loop = asyncio.get_running_loop()
+        function = self._function(op)
+        chunk_size = max(block_bytes, self.chunk_size - self.chunk_size % block_bytes)  # Цілі блоки
+        writer.write(RESPONSE_HEADER.pack(STATUS_OK, length))
+        remaining = length
+        while remaining:
+            chunk = await reader.readexactly(min(chunk_size, remaining))
+            remaining -= len(chunk)
+            try:
+                result = await loop.run_in_executor(self.executor, function, key_id, chunk)
+            except Exception as error:
+                writer.transport.abort()
+                raise ConnectionAbortedError(f"Помилка перетворення потоку: {error}") from error
+            writer.write(result)
+            await writer.drain()  # Не читаємо далі, поки клієнт не прийме відправлене
+
+    async def _discard(self, reader, length: int):
+        """Пропускає дані запиту, який не буде оброблено, щоб зберегти межі наступних запитів."""
+        while length:
+            length -= len(await reader.readexactly(min(self.chunk_size, length)))
+
+    async def _handle_request(self, reader, writer, op: int, key_id: bytes, length: int):
+        """Обробляє один запит з уже прочитаним заголовком."""
+        try:
+            key_id = key_id.decode("utf-8")
+            self._function(op)
+            if key_id not in self.registry:
+                # Файл ключа читається в пулі, щоб завантаження не зупиняло цикл подій
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.registry.get, key_id)
+            block_bytes = self.registry.get(key_id).block_bytes
+            if length % block_bytes:
+                raise ValueError(f"Довжина даних має бути кратною розміру блоку ({block_bytes} байтів).")
+        except Exception as error:  # Некоректний ключ будь-якого виду - відповідь з помилкою, а не обрив з'єднання
+            await self._discard(reader, length)
+            self._write_error(writer, error)
+            return
+        if length > self.batch_threshold:
+            await self._stream(reader, writer, key_id, op, length, block_bytes)
+            return
+        payload = await reader.readexactly(length)
+        try:
+            result = await self._transform_batched(key_id, op, payload)
+        except Exception as error:
+            self._write_error(writer, error)
+            return
+        writer.write(RESPONSE_HEADER.pack(STATUS_OK, len(result)) + result)
+
+    @staticmethod
+    def _write_error(writer, error):
+        """Відправляє відповідь з помилкою."""
+        message = str(error).encode("utf-8")
+        writer.write(RESPONSE_HEADER.pack(STATUS_ERROR, len(message)) + message)
+
+    async def handle(self, reader, writer):
+        """Обслуговує одне з'єднання до його закриття клієнтом або зупинки сервера."""
+        try:
+            await self._serve_connection(reader, writer)
+        except asyncio.CancelledError:
+            # Сервер зупиняється. Обробник завершується звичайно, бо скасоване завдання обробника asyncio
+            # (Python 3.11) виводить як необроблений виняток.
+            writer.transport.abort()
+
+    async def _serve_connection(self, reader, writer):
+        """Обробляє запити з'єднання по черзі."""
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(REQUEST_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break  # Клієнт закрив з'єднання між запитами
+                op, key_length, length = REQUEST_HEADER.unpack(header)
+                key_id = await reader.readexactly(key_length)
+                await self._handle_request(reader, writer, op, key_id, length)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # З'єднання обірвалося посеред запиту
+        finally:
+            writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path=None):
+        """Запускає сервер на TCP-порту або, якщо задано unix_path, на Unix-сокеті та повертає asyncio.Server."""
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle, unix_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        """Зупиняє пул перетворення великих частин."""
+        self.executor.shutdown()
+
+class ServiceClient:
+    """Асинхронний клієнт сервісу шифрування. Запити одного клієнта виконуються по черзі."""
+
+    def __init__(self, reader, writer, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._reader = reader
+        self._writer = writer
+        self._lock = asyncio.Lock()
+        self.chunk_size = chunk_size
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path=None):
+        """Підключається до сервісу на TCP-порту або, якщо задано unix_path, на Unix-сокеті."""
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Закриває з'єднання."""
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _send(self, op: int, key_id: bytes, data):
+        """Відправляє запит частинами, очікуючи, поки сервер прийме кожну з них."""
+        self._writer.write(REQUEST_HEADER.pack(op, len(key_id), len(data)) + key_id)
+        view = memoryview(data)
+        for start in range(0, len(view), self.chunk_size):
+            self._writer.write(view[start:start + self.chunk_size])
+            await self._writer.drain()
+        await self._writer.drain()
+
+    async def request(self, op: int, key_id: str, data) -> bytes:
+        """
+        Виконує запит до сервісу.
+
+        :raises ValueError: Якщо сервіс відхилив запит.
+        """
+        key_id = key_id.encode("utf-8")
+        async with self._lock:
+            # Відповідь на великий запит надходить, поки ми ще відправляємо дані, тому читаємо її одночасно
+            sending = asyncio.ensure_future(self._send(op, key_id, data))
+            try:
+                status, length = RESPONSE_HEADER.unpack(await self._reader.readexactly(RESPONSE_HEADER.size))
+                result = await self._reader.readexactly(length)
+            finally:
+                await sending
+        if status != STATUS_OK:
+            raise ValueError(result.decode("utf-8", "replace"))
+        return result
+
+    async def encrypt(self, key_id: str, data) -> bytes:
+        """Шифрує дані ключем key_id."""
+        return await self.request(OP_ENCRYPT, key_id, data)
+
+    async def decrypt(self, key_id: str, data) -> bytes:
+        """Дешифрує дані ключем key_id."""
+        return await self.request(OP_DECRYPT, key_id, data)
+
+def _percentile(values, fraction: float) -> float:
+    """Повертає перцентиль відсортованого списку (найближчий ранг)."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def run_load(key_id: str, connections: int = 16, requests: int = 10000, size: int = 256,
+                   host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path=None) -> dict:
+    """
+    Навантажувальний тест: connections клієнтів одночасно виконують загалом requests запитів шифрування.
+
+    :return: Словник з кількістю запитів, загальним часом, пропускною здатністю та затримками p50, p99 і max
+             у мілісекундах.
+    """
+    payload = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    clients = [await ServiceClient.connect(host, port, unix_path) for _ in range(connections)]
+    latencies = []
+
+    async def worker(client, count):
+        for _ in range(count):
+            start = time.perf_counter()
+            await client.encrypt(key_id, payload)
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker(client, requests // connections + (index < requests % connections))
+                               for index, client in enumerate(clients)))
+    finally:
+        for client in clients:
+            await client.close()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "connections": connections,
+        "size": size,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+        "max_ms": latencies[-1] * 1e3,
+    }
+
+async def serve(args):
+    """Запускає сервіс і обслуговує з'єднання до переривання."""
+    registry = CipherRegistry(args.key_dir, args.cache_size, args.ttl)
+    service = CipherService(registry, args.batch_threshold, args.batch_delay, args.chunk_size,
+                            ThreadPoolExecutor(args.workers))
+    server = await service.start(args.host, args.port, args.unix)
+    address = args.unix or f"{args.host}:{args.port}"
+    print(f"Сервіс шифрування слухає {address}.", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def build_arg_parser():
+    """Створює розбирач аргументів командного рядка."""
+    parser = argparse.ArgumentParser(description="Локальний асинхронний сервіс шифрування.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("serve", "Запустити сервіс"), ("bench", "Навантажувальний тест запущеного сервісу")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--host", default=DEFAULT_HOST, help="Адреса TCP")
+        sub.add_argument("--port", type=int, default=DEFAULT_PORT, help="Порт TCP")
+        sub.add_argument("--unix", help="Шлях до Unix-сокета (замість TCP)")
+        add_profile_argument(sub)
+
+    serve_parser = subparsers.choices["serve"]
+    serve_parser.add_argument("--key-dir", required=True, help="Каталог з файлами ключів <ідентифікатор>.spk/.json")
+    serve_parser.add_argument("--cache-size", type=int, default=DEFAULT_REGISTRY_SIZE, help="Кількість ключів у кеші")
+    serve_parser.add_argument("--ttl", type=float, help="Час життя ключа в кеші в секундах")
+    serve_parser.add_argument("--batch-threshold", type=int, default=DEFAULT_BATCH_THRESHOLD,
+                              help="Найбільший розмір запиту, який об'єднується в пакет")
+    serve_parser.add_argument("--batch-delay", type=float, default=0.0, help="Час збирання пакета в секундах")
+    serve_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                              help="Розмір частини для великих запитів у байтах")
+    serve_parser.add_argument("--workers", type=int, help="Кількість потоків для великих запитів")
+
+    bench_parser = subparsers.choices["bench"]
+    bench_parser.add_argument("--key-id", required=True, help="Ідентифікатор ключа")
+    bench_parser.add_argument("--connections", type=int, default=16, help="Кількість одночасних з'єднань")
+    bench_parser.add_argument("--requests", type=int, default=10000, help="Загальна кількість запитів")
+    bench_parser.add_argument("--size", type=int, default=256, help="Розмір даних одного запиту в байтах")
+    return parser
+
+def main(argv=None) -> int:
+    """Точка входу командного рядка. Повертає код завершення."""
+    args = build_arg_parser().parse_args(argv)
+    with profiling(args.profile):
+        return _run_command(args)
+
+def _run_command(args) -> int:
+    """Виконує команду з розібраними аргументами."""
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        except (OSError, ValueError) as error:
+            print(f"Не вдалося запустити сервіс: {error}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.connections <= 0 or args.requests < args.connections or args.size < 0:
+        print("Кількість запитів має бути не меншою за кількість з'єднань, а розмір - невід'ємним.", file=sys.stderr)
+        return 2
+    try:
+        report = asyncio.run(run_load(args.key_id, args.connections, args.requests, args.size,
+                                      args.host, args.port, args.unix))
+    except (OSError, ValueError) as error:
+        print(f"Навантажувальний тест не вдався: {error}", file=sys.stderr)
+        return 1
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import os      # Імпортуємо модуль для шляхів.
+import random  # Імпортуємо модуль для відтворюваних ключів і даних.
+import sys     # Імпортуємо модуль для шляху пошуку модулів.
+
+import pytest
+
+# Модулі пакета лежать у корені репозиторію поруч із каталогом tests.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import ConstantTable, PermutationFormula, SPBlockCipher  # noqa: E402
+
+def make_cipher(seed: int) -> SPBlockCipher:
+    """Створює побайтовий шифр з випадковими таблицею констант і формулою перестановки."""
+    rng = random.Random(seed)
+    constants = list(range(16))
+    permutation = list(range(8))
+    rng.shuffle(constants)
+    rng.shuffle(permutation)
+    return SPBlockCipher(ConstantTable(dict(enumerate(constants))), PermutationFormula(permutation))
+
+@pytest.fixture
+def payload():
+    """Відтворювані випадкові дані непарної довжини."""
+    return random.Random(0).randbytes(100_003)
@@ -0,0 +1,80 @@
+import random  # Імпортуємо модуль для відтворюваних таблиць.
+
+import pytest
+
+import analysis
+
+# Таблиця констант PRESENT: відома 4-бітна таблиця з рівномірністю 4 та нелінійністю 4.
+PRESENT = [0xC, 0x5, 0x6, 0xB, 0x9, 0x0, 0xA, 0xD, 0x3, 0xE, 0xF, 0x8, 0x4, 0x7, 0x1, 0x2]
+
+def _parity(value):
+    return bin(value).count("1") & 1
+
+def _naive_ddt(sbox):
+    size = len(sbox)
+    return [[sum(1 for x in range(size) if sbox[x] ^ sbox[x ^ a] == b) for b in range(size)] for a in range(size)]
+
+def _naive_lat(sbox):
+    size = len(sbox)
+    return [[sum(1 for x in range(size) if _parity(a & x) == _parity(b & sbox[x])) - size // 2 for b in range(size)]
+            for a in range(size)]
+
+def _naive_scores(sbox):
+    ddt, lat = _naive_ddt(sbox), _naive_lat(sbox)
+    size = len(sbox)
+    return {
+        "differential_uniformity": max(max(row) for row in ddt[1:]),
+        "nonlinearity": size // 2 - max(abs(lat[a][b]) for a in range(size) for b in range(1, size)),
+        "fixed_points": sum(1 for x in range(size) if sbox[x] == x),
+    }
+
+def _sboxes(count, size, seed):
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        sbox = list(range(size))
+        rng.shuffle(sbox)
+        result.append(sbox)
+    return result
+
+def test_tables_match_naive_computation():
+    assert analysis.difference_distribution_table(PRESENT) == _naive_ddt(PRESENT)
+    assert analysis.linear_approximation_table(PRESENT) == _naive_lat(PRESENT)
+    report = analysis.analyze_sbox(PRESENT)
+    assert report["differential_uniformity"] == 4 and report["nonlinearity"] == 4
+    assert {key: report[key] for key in _naive_scores(PRESENT)} == _naive_scores(PRESENT)
+
+@pytest.mark.parametrize("size", [4, 16, 32])
+def test_lat_of_random_tables(size):
+    for sbox in _sboxes(3, size, size):
+        assert analysis.linear_approximation_table(sbox) == _naive_lat(sbox)
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_score_sboxes_matches_naive(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(analysis, "np", None)
+    sboxes = [PRESENT] + _sboxes(20, 16, 1)
+    scores = analysis.score_sboxes(sboxes)
+    expected = [_naive_scores(sbox) for sbox in sboxes]
+    for key in ("differential_uniformity", "nonlinearity", "fixed_points"):
+        assert scores[key] == [report[key] for report in expected]
+
+def test_score_sboxes_split_into_batches(monkeypatch):
+    pytest.importorskip("numpy")
+    sboxes = _sboxes(25, 16, 2)
+    whole = analysis.score_sboxes(sboxes)
+    monkeypatch.setattr(analysis, "SCORE_BATCH_ELEMENTS", 16 * 16 * 4)  # Пакети по 4 таблиці
+    assert analysis.score_sboxes(sboxes) == whole
+
+def test_walsh_hadamard_batch_matches_scalar():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(3)
+    rows = [[rng.choice((-1, 1)) for _ in range(32)] for _ in range(6)]
+    batch = analysis._walsh_hadamard_batch(np.array(rows, dtype=np.int64))
+    assert batch.tolist() == [analysis.walsh_hadamard(list(row)) for row in rows]
+
+def test_rejects_bad_size():
+    with pytest.raises(ValueError):
+        analysis.analyze_sbox(list(range(12)))
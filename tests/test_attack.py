@@ -0,0 +1,31 @@
+import pytest
+
+import attack
+from conftest import make_cipher
+
+@pytest.mark.parametrize("seed", [1, 3])
+def test_recovers_seeded_key(seed):
+    cipher = make_cipher(seed)
+    pairs = attack.known_pairs(cipher, 64, seed)
+    report = attack.recover_key(pairs)
+    assert report["recovered"] and report["pairs_needed"] <= len(pairs)
+    assert attack.matches_key(report, cipher)
+    # Менше пар, ніж знайдено, ключ однозначно не визначають
+    table, _ = attack.resolve(attack.search_keys(pairs[:report["pairs_needed"] - 1]))
+    assert table is None
+
+@pytest.mark.parametrize("count", [1, 4, 8])
+def test_too_few_pairs_give_no_unique_key(count):
+    cipher = make_cipher(2)
+    pairs = attack.known_pairs(cipher, count, 5)
+    report = attack.recover_key(pairs)
+    assert not report["recovered"] and not attack.matches_key(report, cipher)
+    # Справжній ключ серед кандидатів: відсікання префіксів його не відкидає
+    permutation = list(cipher.permutation_formula.permutation_values)
+    sbox = [cipher.constant_table.constants[i] for i in range(16)]
+    assert any(candidate == permutation and all(value in (-1, sbox[x]) for x, value in enumerate(mapping))
+               for candidate, mapping in attack.search_keys(pairs))
+
+def test_inconsistent_pairs_are_rejected():
+    with pytest.raises(ValueError):
+        attack.normalize_pairs([(1, 2), (1, 3)])
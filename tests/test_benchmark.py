@@ -0,0 +1,23 @@
+import benchmark
+
+def _report(*results):
+    return {"results": [{"case": case, "size": size, "bytes_per_second": speed} for case, size, speed in results]}
+
+def test_missing_baseline_case_is_reported():
+    baseline = _report(("bulk_bytes", 16, 100.0), ("stream", 16, 100.0))
+    current = _report(("bulk_bytes", 16, 100.0), ("numpy", 16, 1.0))
+    regressions = benchmark.compare_results(baseline, current)
+    assert [(item["case"], item["current"]) for item in regressions] == [("stream", None)]
+    assert benchmark._report_regressions(regressions, 0.1) == 1
+
+def test_slowdown_over_threshold_is_reported():
+    baseline = _report(("bulk_bytes", 16, 100.0), ("stream", 16, 100.0))
+    current = _report(("bulk_bytes", 16, 95.0), ("stream", 16, 80.0))
+    regressions = benchmark.compare_results(baseline, current, threshold=0.1)
+    assert [item["case"] for item in regressions] == ["stream"]
+    assert benchmark.compare_results(baseline, baseline) == []
+
+def test_stream_case_runs_cli(tmp_path):
+    run = benchmark._stream(str(tmp_path))(b"payload")
+    run()
+    assert (tmp_path / "output.bin").read_bytes() == benchmark.SPBlockCipher().encrypt_bytes(b"payload")
@@ -0,0 +1,39 @@
+import json    # Імпортуємо модуль для розбору виводу командного рядка.
+import random  # Імпортуємо модуль для відтворюваних обмінів.
+
+import pytest
+
+import generator
+from generator import IncrementalSBoxScore
+from main import load_cipher
+
+@pytest.mark.parametrize("allow_fixed_points", [False, True])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_incremental_score_matches_full_rescoring(seed, allow_fixed_points):
+    rng = random.Random(seed)
+    values = list(range(16))
+    rng.shuffle(values)
+    score = IncrementalSBoxScore(values, 4, 4, allow_fixed_points)
+    for _ in range(200):
+        score.swap(*rng.sample(range(16), 2))
+        full = IncrementalSBoxScore(score.sbox, 4, 4, allow_fixed_points)
+        assert score.cost == full.cost
+        assert score.ddt == full.ddt and score.walsh == full.walsh
+        assert score.fixed_points == full.fixed_points
+
+def test_generated_sbox_meets_targets():
+    result = generator.generate_sbox(seed=5, tasks=4)
+    assert sorted(result["values"]) == list(range(16))
+    assert IncrementalSBoxScore(result["values"], 4, 4).cost == 0
+
+def test_cli_output_is_json_and_keys_load(tmp_path, capsys):
+    sbox, pbox = str(tmp_path / "s.json"), str(tmp_path / "p.json")
+    assert generator.main(["--seed", "1", "--tasks", "4", "--sbox-out", sbox, "--pbox-out", pbox]) == 0
+    report = json.loads(capsys.readouterr().out)
+    cipher = load_cipher(sbox, pbox)
+    assert [cipher.constant_table.constants[i] for i in range(16)] == report["s_box"]["values"]
+    assert list(cipher.permutation_formula.permutation_values) == report["permutation"]["values"]
+
+def test_cli_rejects_non_json_output_path(tmp_path, capsys):
+    assert generator.main(["--seed", "1", "--sbox-out", str(tmp_path / "s.txt")]) == 2
+    assert capsys.readouterr().out == ""
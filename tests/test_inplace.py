@@ -0,0 +1,129 @@
+import json    # Імпортуємо модуль для читання файлу прогресу.
+import os      # Імпортуємо модуль для роботи з файлами.
+
+import pytest
+
+import main
+from conftest import make_cipher
+from main import PROGRESS_BLOCK_SIZE, PROGRESS_SUFFIX, transform_file_inplace
+
+WINDOW = 4096
+
+@pytest.fixture
+def tables():
+    """Таблиці шифрування та дешифрування випадкового ключа."""
+    return make_cipher(11).compile_tables()
+
+@pytest.fixture
+def data_file(tmp_path, payload):
+    path = tmp_path / "data.bin"
+    path.write_bytes(payload)
+    return str(path)
+
+def _crash_at_window(monkeypatch, window_index):
+    """Перериває перетворення одразу після запису стану вікна window_index, до зміни самого вікна."""
+    write_progress = main._write_progress
+    calls = []
+
+    def crashing(progress_path, state):
+        write_progress(progress_path, state)
+        calls.append(state)
+        if len(calls) > window_index:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(main, "_write_progress", crashing)
+    return calls
+
+def _interrupt(monkeypatch, path, table, inverse, window_index, window_size=WINDOW):
+    calls = _crash_at_window(monkeypatch, window_index)
+    with pytest.raises(KeyboardInterrupt):
+        transform_file_inplace(path, table, inverse, window_size)
+    monkeypatch.undo()
+    return calls[-1]
+
+@pytest.mark.parametrize("window_size", [1000, 4096, 1 << 20])
+def test_round_trip(data_file, payload, tables, window_size):
+    table, inverse = tables
+    assert transform_file_inplace(data_file, table, inverse, window_size) == len(payload)
+    with open(data_file, "rb") as f:
+        assert f.read() == payload.translate(table)
+    transform_file_inplace(data_file, inverse, table, window_size)
+    with open(data_file, "rb") as f:
+        assert f.read() == payload
+    assert not os.path.exists(data_file + PROGRESS_SUFFIX)
+
+def test_empty_file(tmp_path, tables):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    assert transform_file_inplace(str(path), *tables) == 0
+
+def test_resume_before_window_written(monkeypatch, data_file, payload, tables):
+    table, inverse = tables
+    _interrupt(monkeypatch, data_file, table, inverse, 5)
+    assert transform_file_inplace(data_file, table, inverse, WINDOW) == len(payload) - 5 * WINDOW
+    with open(data_file, "rb") as f:
+        assert f.read() == payload.translate(table)
+
+def test_resume_after_window_written_before_state_advanced(monkeypatch, data_file, payload, tables):
+    table, inverse = tables
+    state = _interrupt(monkeypatch, data_file, table, inverse, 3)
+    start, end = state["offset"], state["pending_end"]
+    with open(data_file, "r+b") as f:  # Вікно записане повністю, але стан ще не оновлено
+        f.seek(start)
+        f.write(payload[start:end].translate(table))
+    transform_file_inplace(data_file, table, inverse, WINDOW)
+    with open(data_file, "rb") as f:
+        assert f.read() == payload.translate(table)
+
+@pytest.mark.parametrize("blocks", [[1, 2], [0, 3], [0, 1, 2]])
+def test_resume_rolls_back_half_written_window(monkeypatch, data_file, payload, tables, blocks):
+    table, inverse = tables
+    window = 4 * PROGRESS_BLOCK_SIZE
+    state = _interrupt(monkeypatch, data_file, table, inverse, 3, window)
+    with open(data_file, "r+b") as f:  # Переривання посередині запису вікна: частина сторінок уже на диску
+        for block in blocks:
+            start = state["offset"] + block * PROGRESS_BLOCK_SIZE
+            f.seek(start)
+            f.write(payload[start:start + PROGRESS_BLOCK_SIZE].translate(table))
+    transform_file_inplace(data_file, table, inverse, window)
+    with open(data_file, "rb") as f:
+        assert f.read() == payload.translate(table)
+
+def test_progress_is_small(monkeypatch, data_file, tables):
+    table, inverse = tables
+    window = 16 * PROGRESS_BLOCK_SIZE
+    _interrupt(monkeypatch, data_file, table, inverse, 0, window)
+    assert os.path.getsize(data_file + PROGRESS_SUFFIX) < window // 100
+
+def test_torn_block_is_rejected(monkeypatch, data_file, payload, tables):
+    table, inverse = tables
+    state = _interrupt(monkeypatch, data_file, table, inverse, 2)
+    start = state["offset"]
+    with open(data_file, "r+b") as f:  # Розірваний запис усередині одного блоку
+        f.seek(start)
+        f.write(payload[start:start + 10].translate(table))
+    with pytest.raises(ValueError):
+        transform_file_inplace(data_file, table, inverse, WINDOW)
+
+def test_progress_of_other_key_is_rejected(monkeypatch, data_file, tables):
+    table, inverse = tables
+    _interrupt(monkeypatch, data_file, table, inverse, 1)
+    with pytest.raises(ValueError):
+        transform_file_inplace(data_file, inverse, table, WINDOW)
+
+def test_keep_progress_makes_repeat_call_a_no_op(data_file, payload, tables):
+    table, inverse = tables
+    transform_file_inplace(data_file, table, inverse, WINDOW, keep_progress=True)
+    with open(data_file + PROGRESS_SUFFIX) as f:
+        assert json.load(f)["offset"] == len(payload)
+    assert transform_file_inplace(data_file, table, inverse, WINDOW) == 0
+    with open(data_file, "rb") as f:
+        assert f.read() == payload.translate(table)
+
+def test_cipher_methods(data_file, payload):
+    cipher = make_cipher(12)
+    cipher.encrypt_file_inplace(data_file, WINDOW)
+    with open(data_file, "rb") as f:
+        assert f.read() == cipher.encrypt_bytes(payload)
+    cipher.decrypt_file_inplace(data_file, WINDOW)
+    with open(data_file, "rb") as f:
+        assert f.read() == payload
@@ -0,0 +1,48 @@
+import io      # Імпортуємо модуль для потоків у пам'яті.
+import re      # Імпортуємо модуль для пошуку етапів у зведеній таблиці.
+
+import pytest
+
+import instrumentation
+import main
+from conftest import make_cipher
+
+@pytest.mark.parametrize("operation", ["encrypt", "decrypt"])
+def test_split_stages_records_s_and_p(payload, operation):
+    cipher = make_cipher(1)
+    with instrumentation.recording(split_stages=True) as recorder:
+        result = getattr(cipher, f"{operation}_bytes")(payload)
+    assert {"s", "p"} <= set(recorder.timings) and "transform" not in recorder.timings
+    assert recorder.counters[f"{operation}.bytes_in"] == len(payload)
+    assert result == getattr(cipher, f"{operation}_bytes")(payload)
+
+def test_without_split_stages_records_transform(payload):
+    with instrumentation.recording() as recorder:
+        make_cipher(1).encrypt_bytes(payload)
+    assert "transform" in recorder.timings and "s" not in recorder.timings
+
+def test_stream_records_s_and_p(payload):
+    cipher = make_cipher(2)
+    encrypted = io.BytesIO()
+    with instrumentation.recording(split_stages=True) as recorder:
+        cipher.encrypt_stream(io.BytesIO(payload), encrypted, 4096)
+    assert encrypted.getvalue() == cipher.encrypt_bytes(payload)
+    calls = -(-len(payload) // 4096)
+    assert recorder.timings["s"][0] == recorder.timings["p"][0] == calls
+
+def test_profiling_enables_split_stages(tmp_path, payload):
+    log = io.StringIO()
+    with instrumentation.profiling(str(tmp_path / "run.pstats"), log) as recorder:
+        make_cipher(3).encrypt_bytes(payload)
+    assert recorder.split_stages and {"s", "p"} <= set(recorder.timings)
+    assert instrumentation.recorder is None
+
+def test_cli_profile_reports_s_and_p(tmp_path, payload, capsys):
+    source, output = tmp_path / "in.bin", tmp_path / "out.bin"
+    source.write_bytes(payload)
+    profile = tmp_path / "encrypt.pstats"
+    assert main.run_cli(["encrypt", "-i", str(source), "-o", str(output), "--profile", str(profile)]) == 0
+    assert output.read_bytes() == main.SPBlockCipher().encrypt_bytes(payload)
+    summary = capsys.readouterr().err
+    assert re.search(r"^s\s+\d", summary, re.M) and re.search(r"^p\s+\d", summary, re.M)
+    assert profile.exists()
@@ -0,0 +1,75 @@
+import pytest
+
+import main
+from conftest import make_cipher
+from main import KeyBundle, RoundStage, SPBlockCipher, SPNetwork, load_key_file, load_key_snapshot
+
+def _network():
+    return SPNetwork([RoundStage(make_cipher(seed).constant_table, make_cipher(seed).permutation_formula, seed * 17)
+                      for seed in range(1, 5)])
+
+@pytest.mark.parametrize("include_tables", [True, False])
+@pytest.mark.parametrize("factory", [lambda: make_cipher(1), _network])
+def test_round_trip(payload, factory, include_tables):
+    cipher = factory()
+    data = KeyBundle.from_cipher(cipher, include_tables).to_bytes()
+    bundle = KeyBundle.from_bytes(data)
+    assert bundle.to_bytes() == data
+    restored = bundle.to_cipher()
+    assert restored.encrypt_bytes(payload) == cipher.encrypt_bytes(payload)
+    assert restored.decrypt_bytes(cipher.encrypt_bytes(payload)) == payload
+    assert bundle.to_snapshot().encrypt_bytes(payload) == cipher.encrypt_bytes(payload)
+
+def test_single_round_without_round_key_loads_as_block_cipher():
+    assert isinstance(KeyBundle.from_cipher(make_cipher(1)).to_cipher(), SPBlockCipher)
+
+@pytest.mark.parametrize("position", [0, 4, 10, -1])
+def test_corruption_is_rejected(position):
+    data = bytearray(KeyBundle.from_cipher(_network()).to_bytes())
+    data[position] ^= 0x01
+    with pytest.raises(ValueError):
+        KeyBundle.from_bytes(bytes(data))
+
+def test_truncated_file_is_rejected():
+    data = KeyBundle.from_cipher(make_cipher(1)).to_bytes()
+    with pytest.raises(ValueError):
+        KeyBundle.from_bytes(data[:-1])
+
+def test_tables_of_other_key_are_rejected():
+    rounds = KeyBundle.from_cipher(make_cipher(1)).rounds
+    forged = KeyBundle(rounds, make_cipher(2).compile_tables())
+    bundle = KeyBundle.from_bytes(forged.to_bytes())  # Таблиці взаємно обернені й контрольна сума правильна
+    with pytest.raises(ValueError):
+        bundle.to_cipher()
+    with pytest.raises(ValueError):
+        bundle.to_snapshot()
+
+@pytest.mark.parametrize("include_tables", [True, False])
+def test_snapshot_rejects_invalid_rounds(tmp_path, include_tables):
+    cipher = make_cipher(1)
+    bundle = KeyBundle([([99] * 16, list(range(8)), 0)], cipher.compile_tables() if include_tables else None)
+    path = str(tmp_path / "key.spk")
+    bundle.save(path)
+    for loader in (load_key_file, load_key_snapshot):
+        with pytest.raises(ValueError):
+            loader(path)
+
+def test_compose_tables_matches_network():
+    network = _network()
+    assert KeyBundle.from_cipher(network).compose_tables() == tuple(network.compile_tables())
+
+def test_load_key_file_and_snapshot(tmp_path, payload):
+    cipher = _network()
+    path = str(tmp_path / "key.spk")
+    KeyBundle.from_cipher(cipher).save(path)
+    expected = cipher.encrypt_bytes(payload)
+    assert load_key_file(path).encrypt_bytes(payload) == expected
+    assert load_key_snapshot(path).encrypt_bytes(payload) == expected
+
+def test_import_key_cli(tmp_path, payload):
+    cipher = make_cipher(3)
+    sbox, pbox, key = (str(tmp_path / name) for name in ("s.json", "p.json", "key.spk"))
+    cipher.save_constant_table(sbox)
+    cipher.save_permutation_formula(pbox)
+    assert main.run_cli(["import-key", "--sbox", sbox, "--pbox", pbox, "-o", key]) == 0
+    assert load_key_file(key).encrypt_bytes(payload) == cipher.encrypt_bytes(payload)
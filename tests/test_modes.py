@@ -0,0 +1,128 @@
+import functools  # Імпортуємо часткове застосування для пулу з контекстом spawn.
+import io      # Імпортуємо модуль для потоків у пам'яті.
+import json    # Імпортуємо модуль для файлу формули перестановки.
+import multiprocessing  # Імпортуємо контекст запуску процесів spawn.
+import pickle  # Імпортуємо модуль для перевірки серіалізації шифрів.
+import random  # Імпортуємо модуль для відтворюваних даних.
+
+import pytest
+
+import main
+import modes
+from conftest import make_cipher
+from main import WideBlockCipher
+
+LENGTHS = [0, 1, 15, 16, 17, 1000, 4099]
+
+@pytest.fixture(scope="module", params=[64, 128])
+def wide(request):
+    """Широкий шифр з випадковою перестановкою бітів."""
+    rng = random.Random(request.param)
+    permutation = list(range(request.param))
+    rng.shuffle(permutation)
+    return WideBlockCipher(make_cipher(request.param).constant_table, permutation, request.param)
+
+def _data(length):
+    return random.Random(length).randbytes(length)
+
+@pytest.mark.parametrize("mode", modes.MODES)
+@pytest.mark.parametrize("length", LENGTHS)
+def test_round_trip(wide, mode, length):
+    iv = modes.generate_iv(wide) if mode != modes.ECB else None
+    data = _data(length)
+    encrypted = modes.encrypt(wide, mode, data, iv)
+    assert modes.decrypt(wide, mode, encrypted, iv) == data
+    if mode == modes.CTR:
+        assert len(encrypted) == length
+    else:
+        assert len(encrypted) % wide.block_bytes == 0 and len(encrypted) > length
+
+@pytest.mark.parametrize("mode", modes.MODES)
+def test_streaming_matches_one_shot_for_any_chunking(wide, mode):
+    iv = modes.generate_iv(wide) if mode != modes.ECB else None
+    data = _data(5003)
+    expected = modes.encrypt(wide, mode, data, iv)
+    rng = random.Random(7)
+    for _ in range(5):
+        cuts = sorted(rng.sample(range(len(data)), 12))
+        pieces = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+        encryptor = modes.Encryptor(wide, mode, iv)
+        encrypted = b''.join(encryptor.update(piece) for piece in pieces) + encryptor.finalize()
+        assert encrypted == expected
+        decryptor = modes.Decryptor(wide, mode, iv)
+        pieces = [expected[a:b] for a, b in zip([0] + cuts, cuts + [len(expected)])]
+        assert b''.join(decryptor.update(piece) for piece in pieces) + decryptor.finalize() == data
+
+@pytest.mark.parametrize("mode", modes.MODES)
+def test_parallel_matches_sequential(wide, mode):
+    iv = modes.generate_iv(wide) if mode != modes.ECB else None
+    data = _data(40_001)
+    encrypted = modes.encrypt(wide, mode, data, iv)
+    assert modes.encrypt(wide, mode, data, iv, workers=2) == encrypted
+    assert modes.decrypt(wide, mode, encrypted, iv, workers=2) == data
+
+def test_parallel_with_spawn_context(wide, monkeypatch):
+    # Під spawn/forkserver шифр передається робочим процесам через pickle
+    context = multiprocessing.get_context("spawn")
+    monkeypatch.setattr(modes, "ProcessPoolExecutor", functools.partial(modes.ProcessPoolExecutor, mp_context=context))
+    iv = modes.generate_iv(wide)
+    data = _data(40_001)
+    encrypted = modes.encrypt(wide, modes.CTR, data, iv)
+    assert modes.encrypt(wide, modes.CTR, data, iv, workers=2) == encrypted
+    assert modes.decrypt(wide, modes.CTR, encrypted, iv, workers=2) == data
+
+@pytest.mark.parametrize("factory", [lambda: make_cipher(1), lambda: WideBlockCipher(block_size=128)])
+def test_cipher_pickle_round_trip(factory):
+    cipher = factory()
+    restored = pickle.loads(pickle.dumps(cipher))
+    data = _data(256)
+    assert restored.encrypt_bytes(data) == cipher.encrypt_bytes(data)
+    assert restored.decrypt_bytes(cipher.encrypt_bytes(data)) == data
+
+@pytest.mark.parametrize("mode", modes.MODES)
+def test_stream_functions_prefix_iv(wide, mode):
+    data = _data(3001)
+    encrypted = io.BytesIO()
+    modes.encrypt_stream(wide, mode, io.BytesIO(data), encrypted, chunk_size=100)
+    decrypted = io.BytesIO()
+    modes.decrypt_stream(wide, mode, io.BytesIO(encrypted.getvalue()), decrypted, chunk_size=77)
+    assert decrypted.getvalue() == data
+
+def test_ctr_keystream_does_not_repeat(wide):
+    keystream = modes.ctr_keystream(wide, 0, 4096 // wide.block_bytes)
+    assert keystream[:256] != keystream[256:512]
+
+@pytest.mark.parametrize("mode", [modes.CBC, modes.CTR])
+def test_chaining_modes_reject_byte_cipher(mode):
+    cipher = make_cipher(1)
+    with pytest.raises(ValueError):
+        modes.encrypt(cipher, mode, b"data", bytes(1))
+    with pytest.raises(ValueError):
+        modes.Decryptor(cipher, mode, bytes(1))
+
+def test_ecb_on_byte_cipher_round_trips(payload):
+    cipher = make_cipher(1)
+    assert modes.decrypt(cipher, modes.ECB, modes.encrypt(cipher, modes.ECB, payload)) == payload
+
+def test_bad_padding_is_rejected(wide):
+    encrypted = bytearray(modes.encrypt(wide, modes.ECB, b"abc"))
+    encrypted[-1] ^= 0xFF
+    with pytest.raises(ValueError):
+        modes.decrypt(wide, modes.ECB, bytes(encrypted))
+
+def test_cli_rejects_ctr_without_wide_block(tmp_path):
+    source = tmp_path / "in.bin"
+    source.write_bytes(b"secret")
+    assert main.run_cli(["encrypt", "--mode", "ctr", "-i", str(source), "-o", str(tmp_path / "out.bin")]) == 2
+
+def test_cli_cbc_round_trip_with_wide_key(tmp_path, payload):
+    permutation = list(range(64))
+    random.Random(3).shuffle(permutation)
+    pbox = tmp_path / "pbox.json"
+    pbox.write_text(json.dumps({"permutation": permutation, "block_size": 64}))
+    source, encrypted, decrypted = tmp_path / "in.bin", tmp_path / "enc.bin", tmp_path / "dec.bin"
+    source.write_bytes(payload)
+    common = ["--pbox", str(pbox), "--mode", "cbc", "--chunk-size", "4096"]
+    assert main.run_cli(["encrypt", *common, "-i", str(source), "-o", str(encrypted)]) == 0
+    assert main.run_cli(["decrypt", *common, "-i", str(encrypted), "-o", str(decrypted)]) == 0
+    assert decrypted.read_bytes() == payload
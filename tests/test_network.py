@@ -0,0 +1,77 @@
+import io      # Імпортуємо модуль для потоків у пам'яті.
+import random  # Імпортуємо модуль для відтворюваних ключів і даних.
+
+import pytest
+
+from conftest import make_cipher
+from main import RoundStage, SPNetwork, WideBlockCipher
+
+def _rounds(count, seed=0):
+    """Раунди з випадковими таблицями, перестановками та ключами раундів."""
+    rng = random.Random(seed)
+    stages = []
+    for index in range(count):
+        cipher = make_cipher(seed * 100 + index)
+        stages.append(RoundStage(cipher.constant_table, cipher.permutation_formula, rng.randrange(256)))
+    return stages
+
+def _round_by_round(stages, data):
+    for stage in stages:
+        data = stage.encrypt_bytes(data)
+    return data
+
+@pytest.mark.parametrize("count", [1, 2, 5, 16])
+def test_composed_network_matches_round_by_round(count, payload):
+    stages = _rounds(count, count)
+    network = SPNetwork(stages)
+    assert network.is_composable()
+    encrypted = network.encrypt_bytes(payload)
+    assert encrypted == _round_by_round(stages, payload)
+    assert network.decrypt_bytes(encrypted) == payload
+    encrypt_table, decrypt_table = network.compile_tables()
+    assert encrypt_table == _round_by_round(stages, bytes(range(256)))
+    assert bytes(decrypt_table[b] for b in encrypt_table) == bytes(range(256))
+
+def test_nested_network_composes(payload):
+    inner, outer = _rounds(3, 1), _rounds(2, 2)
+    network = SPNetwork([SPNetwork(inner), *outer])
+    assert network.is_composable()
+    assert network.encrypt_bytes(payload) == _round_by_round(inner + outer, payload)
+
+def test_recompiles_after_round_key_change(payload):
+    stages = _rounds(4, 3)
+    network = SPNetwork(stages)
+    before = network.encrypt_bytes(payload)
+    stages[2].round_key ^= 0x5A
+    after = network.encrypt_bytes(payload)
+    assert after != before and after == _round_by_round(stages, payload)
+
+@pytest.fixture
+def mixed():
+    """Мережа з побайтових раундів та раунду з широким блоком, яку неможливо скомпонувати."""
+    permutation = list(range(64))
+    random.Random(5).shuffle(permutation)
+    wide = WideBlockCipher(make_cipher(5).constant_table, permutation, 64)
+    first, last = _rounds(2, 4)
+    return [first, wide, last]
+
+def test_mixed_network_applies_rounds_in_order(mixed):
+    network = SPNetwork(mixed)
+    assert not network.is_composable() and network.block_bytes == 8
+    with pytest.raises(ValueError):
+        network.compile()
+    data = random.Random(6).randbytes(8 * 500)
+    encrypted = network.encrypt_bytes(data)
+    assert encrypted == _round_by_round(mixed, data)
+    assert network.decrypt_bytes(encrypted) == data
+    # Порядок раундів має значення: мережа не зводиться до переставлених раундів
+    assert encrypted != _round_by_round(mixed[::-1], data)
+
+def test_mixed_network_streams_and_rejects_partial_blocks(mixed):
+    network = SPNetwork(mixed)
+    data = random.Random(7).randbytes(8 * 1000)
+    encrypted = io.BytesIO()
+    assert network.encrypt_stream(io.BytesIO(data), encrypted, chunk_size=100) == len(data)
+    assert encrypted.getvalue() == network.encrypt_bytes(data)
+    with pytest.raises(ValueError):
+        network.encrypt_bytes(data[:-1])
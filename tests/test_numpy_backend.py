@@ -0,0 +1,48 @@
+import pytest
+
+import main
+from conftest import make_cipher
+from main import NumpySPBackend
+
+np = pytest.importorskip("numpy")
+
+OPERATIONS = ["encrypt", "decrypt"]
+
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_matches_bytes_translate(payload, operation):
+    cipher = make_cipher(5)
+    backend = NumpySPBackend(cipher)
+    expected = getattr(cipher, f"{operation}_bytes")(payload)
+    array = np.frombuffer(payload, dtype=np.uint8).copy()
+    assert getattr(backend, operation)(array).tobytes() == expected
+    out = np.empty_like(array)
+    assert getattr(backend, operation)(array, out=out) is out and out.tobytes() == expected
+    getattr(backend, operation)(array, out=array)  # На місці
+    assert array.tobytes() == expected
+
+def test_bitwise_matches_table_path(payload):
+    cipher = make_cipher(6)
+    backend = NumpySPBackend(cipher)
+    array = np.frombuffer(payload[:100_000], dtype=np.uint8).reshape(100, 1000)
+    out = np.empty_like(array)
+    backend.encrypt_bitwise(array, out=out)
+    assert out.tobytes() == cipher.encrypt_bytes(array.tobytes())
+    assert backend.decrypt_bitwise(out).tobytes() == array.tobytes()
+
+@pytest.mark.parametrize("method", ["encrypt", "decrypt", "encrypt_bitwise", "decrypt_bitwise"])
+def test_bytes_input_and_wrong_dtype(payload, method):
+    cipher = make_cipher(7)
+    backend = NumpySPBackend(cipher)
+    expected = cipher.encrypt_bytes(payload) if method.startswith("encrypt") else cipher.decrypt_bytes(payload)
+    assert getattr(backend, method)(payload).tobytes() == expected
+    with pytest.raises(TypeError):
+        getattr(backend, method)(np.array([300], dtype=np.int64))
+
+def test_falls_back_to_translate_without_numpy(payload, monkeypatch):
+    cipher = make_cipher(7)
+    monkeypatch.setattr(main, "np", None)
+    backend = NumpySPBackend(cipher)
+    assert backend.encrypt(payload) == cipher.encrypt_bytes(payload)
+    out = bytearray(len(payload))
+    backend.decrypt_bitwise(cipher.encrypt_bytes(payload), out=out)
+    assert out == payload
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from conftest import make_cipher
+from main import KeyBundle
+from registry import CipherRegistry
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _key_dir(tmp_path, *seeds):
+    for seed in seeds:
+        KeyBundle.from_cipher(make_cipher(seed)).save(str(tmp_path / f"key{seed}.spk"))
+    return str(tmp_path)
+
+def test_registered_key_does_not_expire(tmp_path):
+    clock = FakeClock()
+    registry = CipherRegistry(_key_dir(tmp_path, 1), max_size=1, ttl=10, clock=clock)
+    cipher = make_cipher(7)
+    registry.register("memory", cipher)
+    clock.now = 100
+    registry.get("key1")  # Заповнює кеш і витіснила б незакріплений запис
+    assert registry.get("memory") is cipher
+    assert registry.stats()["pinned"] == 1
+
+def test_unpinned_registration_expires():
+    clock = FakeClock()
+    registry = CipherRegistry(ttl=10, clock=clock)
+    registry.register("memory", make_cipher(7), pinned=False)
+    clock.now = 100
+    with pytest.raises(ValueError):
+        registry.get("memory")  # Каталогу ключів немає, відновити запис неможливо
+
+def test_concurrent_misses_load_once(tmp_path):
+    key_dir = _key_dir(tmp_path, 1)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        started.set()
+        release.wait(5)
+        return make_cipher(1)
+
+    registry = CipherRegistry(key_dir, loader=loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("key1"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+def test_failed_load_is_shared_and_not_cached(tmp_path):
+    registry = CipherRegistry(str(tmp_path))
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            registry.get("missing")
+    assert "missing" not in registry
+
+def test_load_finished_after_invalidate_is_dropped(tmp_path):
+    key_dir = _key_dir(tmp_path, 1)
+    started = threading.Event()
+    release = threading.Event()
+    stale = make_cipher(1)
+
+    def loader(path):
+        started.set()
+        release.wait(5)
+        return stale
+
+    registry = CipherRegistry(key_dir, loader=loader)
+    thread = threading.Thread(target=registry.get, args=("key1",))
+    thread.start()
+    started.wait(5)
+    registry.invalidate("key1")
+    release.set()
+    thread.join()
+    assert "key1" not in registry
+    fresh = make_cipher(2)
+    registry.loader = lambda path: fresh
+    assert registry.get("key1") is fresh
+
+def test_register_wins_over_load_in_flight(tmp_path):
+    key_dir = _key_dir(tmp_path, 1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader(path):
+        started.set()
+        release.wait(5)
+        return make_cipher(1)
+
+    registry = CipherRegistry(key_dir, loader=loader)
+    thread = threading.Thread(target=registry.get, args=("key1",))
+    thread.start()
+    started.wait(5)
+    registered = make_cipher(3)
+    registry.register("key1", registered)
+    release.set()
+    thread.join()
+    assert registry.get("key1") is registered
+
+def test_lru_eviction_and_stats(tmp_path):
+    registry = CipherRegistry(_key_dir(tmp_path, 1, 2, 3), max_size=2)
+    data = bytes(range(256))
+    for seed in (1, 2, 3, 1):
+        assert registry.encrypt_bytes(f"key{seed}", data) == make_cipher(seed).encrypt_bytes(data)
+    stats = registry.stats()
+    assert stats["misses"] == 4 and stats["evictions"] == 2 and stats["size"] == 2
@@ -0,0 +1,104 @@
+import os      # Імпортуємо модуль для роботи з файлами.
+
+import pytest
+
+import main
+from conftest import make_cipher
+from main import KeyBundle, collect_rekey_files, rekey_paths, rekey_tables
+
+def _write_tree(root, cipher, payloads):
+    """Записує в каталог файли, зашифровані шифром cipher."""
+    for name, data in payloads.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(cipher.encrypt_bytes(data))
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+@pytest.fixture
+def tree(tmp_path, payload):
+    """Каталог із трьох файлів, зашифрованих старим ключем, і відкриті тексти цих файлів."""
+    payloads = {"a.bin": payload, "sub/b.bin": payload[::-1], "sub/c.bin": payload[:777]}
+    _write_tree(tmp_path / "data", make_cipher(1), payloads)
+    return tmp_path / "data", payloads
+
+def _check_new_key(root, payloads, cipher):
+    for name, data in payloads.items():
+        assert cipher.decrypt_bytes(_read(os.path.join(root, name))) == data
+
+def test_rekey_tables_compose_decrypt_and_encrypt(payload):
+    old, new = make_cipher(1), make_cipher(2)
+    table, inverse = rekey_tables(old, new)
+    assert old.encrypt_bytes(payload).translate(table) == new.encrypt_bytes(payload)
+    assert new.encrypt_bytes(payload).translate(inverse) == old.encrypt_bytes(payload)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rekey_paths_round_trip(tmp_path, tree, workers):
+    root, payloads = tree
+    manifest = str(tmp_path / "manifest.jsonl")
+    summary = rekey_paths([str(root)], make_cipher(1), make_cipher(2), manifest, workers, window_size=4096)
+    assert summary["files"] == 3 and not summary["errors"]
+    _check_new_key(root, payloads, make_cipher(2))
+    assert not [name for name in os.listdir(root) if name.endswith(main.PROGRESS_SUFFIX)]
+
+    # Повторний запуск з тим самим журналом нічого не перешифровує вдруге
+    summary = rekey_paths([str(root)], make_cipher(1), make_cipher(2), manifest, workers, window_size=4096)
+    assert summary["files"] == 0 and summary["skipped"] == 3
+    _check_new_key(root, payloads, make_cipher(2))
+
+def test_rekey_paths_resumes_after_interruption(tmp_path, tree, monkeypatch):
+    root, payloads = tree
+    manifest = str(tmp_path / "manifest.jsonl")
+    record = main.RekeyManifest.record
+    calls = []
+
+    def crash_after_first(self, path, size):
+        if calls:
+            raise KeyboardInterrupt  # Переривання після перешифрування файлу, але до запису в журнал
+        calls.append(path)
+        record(self, path, size)
+
+    monkeypatch.setattr(main.RekeyManifest, "record", crash_after_first)
+    with pytest.raises(KeyboardInterrupt):
+        rekey_paths([str(root)], make_cipher(1), make_cipher(2), manifest, window_size=4096)
+    monkeypatch.setattr(main.RekeyManifest, "record", record)
+
+    summary = rekey_paths([str(root)], make_cipher(1), make_cipher(2), manifest, window_size=4096)
+    assert summary["skipped"] == 1 and summary["files"] == 2 and not summary["errors"]
+    _check_new_key(root, payloads, make_cipher(2))
+
+def test_rekey_paths_rejects_manifest_of_other_key(tmp_path, tree):
+    root, _ = tree
+    manifest = str(tmp_path / "manifest.jsonl")
+    rekey_paths([str(root)], make_cipher(1), make_cipher(2), manifest)
+    with pytest.raises(ValueError):
+        rekey_paths([str(root)], make_cipher(2), make_cipher(3), manifest)
+
+def test_collect_rekey_files_skips_key_files_and_manifests(tmp_path, tree):
+    root, payloads = tree
+    make_cipher(3).save_constant_table(str(root / "sbox.json"))
+    make_cipher(3).save_permutation_formula(str(root / "pbox.json"))
+    KeyBundle.from_cipher(make_cipher(3)).save(str(root / "key.bin"))
+    rekey_paths([str(root / "a.bin")], make_cipher(1), make_cipher(2), str(root / "sub" / "other.jsonl"))
+    found = collect_rekey_files([str(root)], str(tmp_path / "manifest.jsonl"))
+    assert found == sorted(str(root / name) for name in payloads)
+
+def test_rekey_paths_rekeys_linked_file_once(tmp_path, tree):
+    root, payloads = tree
+    os.symlink(root / "a.bin", root / "sub" / "link.bin")
+    os.link(root / "sub" / "b.bin", root / "hard.bin")
+    manifest = str(tmp_path / "manifest.jsonl")
+    found = collect_rekey_files([str(root), str(root / "sub" / "link.bin")], manifest)
+    assert len(found) == 3
+    summary = rekey_paths([str(root)], make_cipher(1), make_cipher(2), manifest, window_size=4096)
+    assert summary["files"] == 3 and not summary["errors"]
+    _check_new_key(root, payloads, make_cipher(2))
+
+def test_rekey_cli_rejects_same_input_and_output(tmp_path, payload):
+    path = tmp_path / "data.bin"
+    path.write_bytes(payload)
+    assert main.run_cli(["rekey", "-i", str(path), "-o", str(path)]) == 2
+    assert path.read_bytes() == payload
@@ -0,0 +1,107 @@
+import asyncio  # Імпортуємо модуль для запуску сервісу в тестах.
+import time    # Імпортуємо модуль для вимірювання чутливості циклу подій.
+
+import pytest
+
+import service
+from conftest import make_cipher
+from registry import CipherRegistry
+from service import CipherService, ServiceClient
+
+class _FailingCipher:
+    """Шифр з блоком 2 байти, перетворення якого завжди завершується непередбаченою помилкою."""
+
+    block_bytes = 2
+
+    def encrypt_bytes(self, data):
+        raise RuntimeError("збій шифру")
+
+    decrypt_bytes = encrypt_bytes
+
+class _SlowCipher:
+    """Побайтовий шифр, перетворення якого блокує потік на delay секунд."""
+
+    block_bytes = 2
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def encrypt_bytes(self, data):
+        time.sleep(self.delay)
+        return bytes(data)
+
+def _run(tmp_path, scenario, **options):
+    """Запускає сервіс на Unix-сокеті, виконує scenario(path, service) і зупиняє сервіс."""
+    registry = CipherRegistry()
+    registry.register("good", make_cipher(1))
+    registry.register("failing", _FailingCipher())
+    registry.register("slow", _SlowCipher(0.3))
+    path = str(tmp_path / "service.sock")
+
+    async def main():
+        cipher_service = CipherService(registry, **options)
+        server = await cipher_service.start(unix_path=path)
+        try:
+            return await scenario(path, cipher_service)
+        finally:
+            server.close()
+            await server.wait_closed()
+            cipher_service.close()
+    return asyncio.run(asyncio.wait_for(main(), 10))
+
+def test_round_trip_small_and_streamed(tmp_path, payload):
+    async def scenario(path, _):
+        async with await ServiceClient.connect(unix_path=path) as client:
+            small = await asyncio.gather(*(client.encrypt("good", payload[:100]) for _ in range(5)))
+            large = await client.encrypt("good", payload)
+            return small, large, await client.decrypt("good", large)
+    small, large, decrypted = _run(tmp_path, scenario, batch_threshold=1024, chunk_size=4096)
+    assert small == [make_cipher(1).encrypt_bytes(payload[:100])] * 5
+    assert large == make_cipher(1).encrypt_bytes(payload) and decrypted == payload
+
+def test_unexpected_batch_error_reaches_every_client(tmp_path):
+    async def scenario(path, _):
+        clients = [await ServiceClient.connect(unix_path=path) for _ in range(3)]
+        results = await asyncio.gather(*(client.encrypt("failing", b"ab") for client in clients),
+                                       return_exceptions=True)
+        for client in clients:
+            await client.close()
+        return results
+    results = _run(tmp_path, scenario, batch_delay=0.01)
+    assert all(isinstance(result, ValueError) and "збій шифру" in str(result) for result in results)
+
+def test_stream_error_aborts_connection_without_crashing_server(tmp_path):
+    async def scenario(path, _):
+        async with await ServiceClient.connect(unix_path=path) as client:
+            with pytest.raises((asyncio.IncompleteReadError, ConnectionError)):
+                await client.encrypt("failing", bytes(4096))
+        async with await ServiceClient.connect(unix_path=path) as client:
+            return await client.encrypt("good", b"still alive")
+    assert _run(tmp_path, scenario, batch_threshold=16, chunk_size=1024) == make_cipher(1).encrypt_bytes(b"still alive")
+
+def test_batch_transform_does_not_block_event_loop(tmp_path):
+    async def scenario(path, _):
+        async with await ServiceClient.connect(unix_path=path) as client:
+            request = asyncio.ensure_future(client.encrypt("slow", b"ab"))
+            started = time.perf_counter()
+            await asyncio.sleep(0.05)  # Цикл подій має прокинутися вчасно, поки пакет обробляється
+            woke = time.perf_counter() - started
+            await request
+            return woke
+    assert _run(tmp_path, scenario) < 0.2
+
+def test_stale_timer_does_not_flush_newer_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "MAX_BATCH_BYTES", 4)
+
+    async def scenario(path, _):
+        clients = [await ServiceClient.connect(unix_path=path) for _ in range(2)]
+        # Два запити заповнюють пакет і обробляються одразу, але таймер цього пакета ще чекає
+        await asyncio.gather(*(client.encrypt("good", b"ab") for client in clients))
+        await asyncio.sleep(0.15)
+        started = time.perf_counter()
+        await clients[0].encrypt("good", b"ab")  # Новий пакет має чекати свої 0.2 с, а не залишок старого таймера
+        latency = time.perf_counter() - started
+        for client in clients:
+            await client.close()
+        return latency
+    assert _run(tmp_path, scenario, batch_delay=0.2) >= 0.18
@@ -0,0 +1,39 @@
+import pickle  # Імпортуємо модуль для перевірки серіалізації знімка.
+from concurrent.futures import ProcessPoolExecutor  # Імпортуємо пул процесів.
+
+import pytest
+
+import modes
+from conftest import make_cipher
+from main import CipherSnapshot, RotatingCipher, ThreadedSPCipher
+
+@pytest.fixture
+def snapshot():
+    return CipherSnapshot.from_cipher(make_cipher(21))
+
+def test_snapshot_is_immutable(snapshot):
+    with pytest.raises(AttributeError):
+        snapshot.encrypt_table = bytes(256)
+
+def test_snapshot_pickles_and_crosses_process_pool(snapshot, payload):
+    restored = pickle.loads(pickle.dumps(snapshot))
+    assert restored.compile_tables() == snapshot.compile_tables() and restored.key_version == snapshot.key_version
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(snapshot.encrypt_bytes, payload).result() == make_cipher(21).encrypt_bytes(payload)
+
+def test_snapshot_works_with_modes(snapshot, payload):
+    assert snapshot.block_bytes == 1
+    assert modes.decrypt(snapshot, modes.ECB, modes.encrypt(snapshot, modes.ECB, payload)) == payload
+
+@pytest.mark.parametrize("release_gil", [False, True])
+def test_transform_into(snapshot, payload, release_gil):
+    out = bytearray(len(payload))
+    snapshot.transform_into(payload, out, "encrypt", release_gil)
+    assert out == snapshot.encrypt_bytes(payload)
+
+def test_threaded_cipher_uses_rotated_key(payload):
+    rotating = RotatingCipher(make_cipher(1))
+    with ThreadedSPCipher(rotating, workers=3, shard_size=4096) as threaded:
+        assert threaded.encrypt_bytes(payload) == make_cipher(1).encrypt_bytes(payload)
+        rotating.rotate(make_cipher(2))
+        assert threaded.encrypt_bytes(payload) == make_cipher(2).encrypt_bytes(payload)
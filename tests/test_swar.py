@@ -0,0 +1,49 @@
+import random  # Імпортуємо модуль для відтворюваних даних.
+
+import pytest
+
+from conftest import make_cipher
+from main import BitslicedSBox, SwarSPEngine, algebraic_normal_form
+
+LENGTHS = [0, 1, 7, 8, 9, 63, 64, 65, 1000, 4099]
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize("chunk_size", [1, 8, 64, 1 << 16])
+def test_matches_table_path(seed, chunk_size):
+    cipher = make_cipher(seed)
+    engine = SwarSPEngine(cipher, chunk_size)
+    for length in LENGTHS:
+        data = random.Random(length).randbytes(length)
+        encrypted = engine.encrypt_bytes(data)
+        assert encrypted == cipher.encrypt_bytes(data)
+        assert engine.decrypt_bytes(encrypted) == data
+
+def test_all_byte_values():
+    cipher = make_cipher(9)
+    data = bytes(range(256))
+    assert SwarSPEngine(cipher).encrypt_bytes(data) == cipher.encrypt_bytes(data)
+    assert SwarSPEngine(cipher).decrypt_bytes(data) == cipher.decrypt_bytes(data)
+
+def test_key_change_rebuilds_circuits():
+    cipher = make_cipher(1)
+    engine = SwarSPEngine(cipher)
+    data = bytes(range(256))
+    engine.encrypt_bytes(data)
+    cipher.permutation_formula.permutation_values = make_cipher(2).permutation_formula.permutation_values
+    assert engine.encrypt_bytes(data) == cipher.encrypt_bytes(data)
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_bitsliced_sbox_matches_table(seed):
+    sbox = list(range(16))
+    random.Random(seed).shuffle(sbox)
+    nibbles = list(range(16))
+    value = sum(nibble << (4 * index) for index, nibble in enumerate(nibbles))
+    ones = int.from_bytes(b"\x11" * 8, "little")
+    result = BitslicedSBox(sbox).evaluate(value, ones)
+    assert [(result >> (4 * index)) & 0xF for index in range(16)] == [sbox[nibble] for nibble in nibbles]
+
+def test_algebraic_normal_form_round_trip():
+    rng = random.Random(7)
+    truth_table = [rng.randrange(2) for _ in range(16)]
+    # Перетворення Мебіуса - інволюція: повторне застосування повертає таблицю істинності
+    assert algebraic_normal_form(algebraic_normal_form(truth_table)) == truth_table
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import verify
+from conftest import make_cipher
+from main import KeyBundle, RoundStage, SPNetwork, WideBlockCipher, verify_cipher
+
+IDENTITY = bytes(range(256))
+
+def _network():
+    return SPNetwork([RoundStage(make_cipher(seed).constant_table, make_cipher(seed).permutation_formula, seed * 17)
+                      for seed in range(1, 5)])
+
+@pytest.mark.parametrize("factory", [lambda: make_cipher(1), _network, lambda: WideBlockCipher(block_size=128)])
+def test_valid_ciphers_pass(factory):
+    report = verify_cipher(factory(), check_methods=True)
+    assert report.ok, report.to_dict()
+
+def test_consistent_compile_error_is_detected():
+    cipher = make_cipher(1)
+    # Обидві таблиці взаємно обернені, але не відповідають ключу: перевірка туди й назад цього не помітить
+    cipher.compile().update(encrypt=IDENTITY, decrypt=IDENTITY, s=IDENTITY, s_inverse=IDENTITY)
+    report = verify_cipher(cipher)
+    assert not report.checks['s_block']
+    assert not report.checks['both_blocks']
+    assert report.checks['p_block']
+
+def test_consistent_network_compile_error_is_detected():
+    network = _network()
+    network.compile().update(encrypt=IDENTITY, decrypt=IDENTITY)
+    assert not verify_cipher(network).checks['both_blocks']
+
+def test_wrong_inverse_table_is_detected():
+    cipher = make_cipher(1)
+    tables = cipher.compile()
+    tables['decrypt'] = tables['decrypt'][1:] + tables['decrypt'][:1]
+    assert not verify_cipher(cipher).checks['both_blocks']
+
+def test_wide_scatter_error_is_detected():
+    cipher = WideBlockCipher(block_size=64)
+    tables = cipher.compile_scatter()
+    tables['encrypt'][0][5] ^= 1
+    assert verify_cipher(cipher).failures['p_block'] == [(0, 5)]
+
+def test_load_key_formats(tmp_path):
+    cipher = make_cipher(3)
+    bundle = tmp_path / "key.spk"
+    KeyBundle.from_cipher(_network()).save(str(bundle))
+    network = tmp_path / "network.json"
+    _network().save_key_file(str(network))
+    combined = tmp_path / "combined.json"
+    combined.write_text(json.dumps({"constants": dict(cipher.constant_table.constants),
+                                    "permutation": list(cipher.permutation_formula.permutation_values)}))
+    data = bytes(range(256))
+    assert verify.load_key(str(bundle)).encrypt_bytes(data) == _network().encrypt_bytes(data)
+    assert verify.load_key(str(network)).encrypt_bytes(data) == _network().encrypt_bytes(data)
+    assert verify.load_key(str(combined)).encrypt_bytes(data) == cipher.encrypt_bytes(data)
+    assert all(report.ok for report in verify.verify_paths([str(tmp_path)]))
+
+def test_invalid_key_file_is_reported(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text(json.dumps({"constants": {str(i): 0 for i in range(16)}, "permutation": list(range(8))}))
+    report = verify.verify_key_file(str(path))
+    assert not report.ok and report.error.startswith("ValueError")
@@ -0,0 +1,93 @@
+import json    # Імпортуємо модуль для файлу формули перестановки.
+import os      # Імпортуємо модуль для шляху до main.py.
+import random  # Імпортуємо модуль для відтворюваних ключів і даних.
+import subprocess  # Імпортуємо модуль для запуску командного рядка зі stdin.
+import sys     # Імпортуємо модуль для шляху до інтерпретатора.
+
+import pytest
+
+import main
+from conftest import make_cipher
+from main import WideBlockCipher
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+@pytest.fixture(scope="module", params=[64, 128])
+def wide(request):
+    """Широкий шифр з випадковими S-блоком та перестановкою бітів."""
+    permutation = list(range(request.param))
+    random.Random(request.param).shuffle(permutation)
+    return WideBlockCipher(make_cipher(request.param).constant_table, permutation, request.param)
+
+def _reference_encrypt(cipher, block):
+    """Еталон: S-блок для кожної тетради, потім переміщення кожного біта окремо."""
+    sbox = cipher.constant_table.constants
+    substituted = [sbox[b & 0xF] | sbox[b >> 4] << 4 for b in block]
+    output = [0] * cipher.block_bytes
+    for i in range(cipher.block_size):
+        if substituted[i // 8] >> (i % 8) & 1:
+            target = cipher.bit_permutation[i]
+            output[target // 8] |= 1 << (target % 8)
+    return bytes(output)
+
+def _reference_encrypt_all(cipher, data):
+    return b"".join(_reference_encrypt(cipher, data[i:i + cipher.block_bytes])
+                    for i in range(0, len(data), cipher.block_bytes))
+
+def test_scatter_tables_match_per_bit_reference(wide):
+    tables = wide.compile_scatter()["encrypt"]
+    sbox = wide.constant_table.constants
+    assert len(tables) == wide.block_bytes
+    for position in range(wide.block_bytes):
+        for value in range(256):
+            substituted = sbox[value & 0xF] | sbox[value >> 4] << 4
+            expected = sum(1 << wide.bit_permutation[position * 8 + bit] for bit in range(8) if substituted >> bit & 1)
+            assert tables[position][value] == expected
+    data = random.Random(1).randbytes(wide.block_bytes * 50)
+    assert wide.encrypt_bytes(data) == _reference_encrypt_all(wide, data)
+
+@pytest.mark.parametrize("blocks", [0, 1, 7, 300])
+def test_round_trip(wide, blocks):
+    data = random.Random(blocks).randbytes(wide.block_bytes * blocks)
+    encrypted = wide.encrypt_bytes(data)
+    assert len(encrypted) == len(data)
+    assert wide.decrypt_bytes(encrypted) == data
+
+def test_tables_follow_key_change(wide):
+    cipher = WideBlockCipher(wide.constant_table, wide.bit_permutation, wide.block_size)
+    data = random.Random(2).randbytes(cipher.block_bytes * 10)
+    before = cipher.encrypt_bytes(data)
+    cipher.bit_permutation = list(reversed(cipher.bit_permutation))
+    assert cipher.encrypt_bytes(data) == _reference_encrypt_all(cipher, data) != before
+
+def test_partial_block_is_rejected(wide):
+    with pytest.raises(ValueError):
+        wide.encrypt_bytes(bytes(wide.block_bytes + 1))
+
+@pytest.fixture
+def pbox(tmp_path):
+    permutation = list(range(64))
+    random.Random(3).shuffle(permutation)
+    path = tmp_path / "pbox.json"
+    path.write_text(json.dumps({"permutation": permutation, "block_size": 64}))
+    return str(path)
+
+def test_cli_rejects_partial_block_before_writing(tmp_path, pbox):
+    source, output = tmp_path / "in.bin", tmp_path / "out.bin"
+    source.write_bytes(bytes(8 * 1000 + 3))
+    assert main.run_cli(["encrypt", "--pbox", pbox, "--chunk-size", "64", "-i", str(source), "-o", str(output)]) == 2
+    assert not output.exists()
+
+def test_cli_stdin_partial_block_writes_nothing(pbox):
+    result = subprocess.run([sys.executable, MAIN, "encrypt", "--pbox", pbox, "--chunk-size", "64"],
+                            input=bytes(8 * 1000 + 3), capture_output=True)
+    assert result.returncode == 2 and result.stdout == b""
+
+def test_cli_stdin_round_trip(pbox):
+    data = random.Random(4).randbytes(8 * 1000)
+    encrypted = subprocess.run([sys.executable, MAIN, "encrypt", "--pbox", pbox], input=data,
+                               capture_output=True, check=True).stdout
+    assert encrypted == main.load_cipher(None, pbox).encrypt_bytes(data)
+    decrypted = subprocess.run([sys.executable, MAIN, "decrypt", "--pbox", pbox], input=encrypted,
+                               capture_output=True, check=True).stdout
+    assert decrypted == data
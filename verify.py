@@ -0,0 +1,142 @@
+import argparse  # Імпортуємо модуль для розбору аргументів командного рядка.
+import json    # Імпортуємо модуль для читання файлів ключів та виводу звітів.
+import os      # Імпортуємо модуль для роботи з файловою системою.
+import sys     # Імпортуємо модуль для стандартних потоків.
+from concurrent.futures import ProcessPoolExecutor  # Імпортуємо пул процесів для паралельної перевірки.
+
+from instrumentation import add_profile_argument, profiling
+from main import KEY_BUNDLE_MAGIC, VerificationReport, load_cipher, load_key_file, verify_cipher
+
+# Розширення файлів ключів, які шукаються в каталогах.
+KEY_EXTENSIONS = (".json", ".spk")
+
+def load_key(path: str):
+    """
+    Завантажує шифр з файлу ключа завантажувачами main.py.
+
+    Двійковий файл ключа (KeyBundle) та файл багатораундової мережі ({"rounds": [...]}) завантажує load_key_file.
+    Файл з таблицею констант і формулою перестановки в одному словнику ({"constants": ..., "permutation": ...,
+    "block_size": ...}) завантажує load_cipher, якому цей файл передається і як таблиця, і як формула.
+
+    :raises OSError: Якщо файл не вдалося прочитати.
+    :raises ValueError: Якщо файл містить некоректні дані.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    if not content.startswith(KEY_BUNDLE_MAGIC):
+        data = json.loads(content)  # json.JSONDecodeError є підкласом ValueError
+        if isinstance(data, dict) and "rounds" not in data and ("constants" in data or "permutation" in data):
+            return load_cipher(path, path)
+    return load_key_file(path)
+
+def verify_key_file(path: str, check_methods: bool = False):
+    """Перевіряє один файл ключа. Помилка завантаження записується у звіт, а не піднімається."""
+    try:
+        cipher = load_key(path)
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        report = VerificationReport(path)
+        report.error = f"{type(error).__name__}: {error}"
+        return report
+    return verify_cipher(cipher, path, check_methods)
+
+def verify_constant_values(values, source=None):
+    """
+    Швидко перевіряє одну таблицю констант, задану списком з 16 значень, без побудови SPBlockCipher.
+
+    :return: VerificationReport з перевіркою 's_block'.
+    """
+    report = VerificationReport(source)
+    values = list(values)
+    if len(values) != 16 or sorted(values) != list(range(16)):
+        # Позиції зі значеннями поза межами або з повторами; якщо таких немає, не вистачає значень
+        invalid = [i for i, value in enumerate(values) if not 0 <= value < 16 or values.count(value) > 1]
+        report.add('s_block', invalid or list(range(16)))
+        return report
+    inverse = [0] * 16
+    for index, value in enumerate(values):
+        inverse[value] = index
+    report.add('s_block', [i for i in range(16) if inverse[values[i]] != i])
+    return report
+
+def _verify_constant_batch(batch):
+    """Перевіряє частину таблиць констант. Виконується в робочому процесі."""
+    start, candidates = batch
+    return [verify_constant_values(values, start + index) for index, values in enumerate(candidates)]
+
+def verify_constant_tables(candidates, workers: int = 1, batch_size: int = 10000):
+    """
+    Перевіряє велику кількість таблиць констант; джерелом у звіті є індекс таблиці.
+
+    :param candidates: Послідовність списків з 16 значень.
+    :param workers: Кількість процесів (1 - без пулу, 0 або None - за кількістю ядер).
+    :param batch_size: Кількість таблиць в одному завданні.
+    :return: Список VerificationReport у порядку вхідних таблиць.
+    """
+    candidates = list(candidates)
+    batches = [(start, candidates[start:start + batch_size]) for start in range(0, len(candidates), batch_size)]
+    if workers == 1:
+        return [report for batch in batches for report in _verify_constant_batch(batch)]
+    with ProcessPoolExecutor(max_workers=workers or None) as executor:
+        return [report for reports in executor.map(_verify_constant_batch, batches) for report in reports]
+
+def collect_key_files(paths):
+    """Повертає відсортований список файлів ключів з переданих файлів та каталогів (рекурсивно)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.endswith(KEY_EXTENSIONS))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def verify_paths(paths, workers: int = 1, check_methods: bool = False):
+    """
+    Перевіряє всі файли ключів з переданих файлів та каталогів.
+
+    :param workers: Кількість процесів (1 - без пулу, 0 або None - за кількістю ядер).
+    :return: Список VerificationReport у порядку відсортованих шляхів.
+    """
+    files = collect_key_files(paths)
+    if workers == 1:
+        return [verify_key_file(path, check_methods) for path in files]
+    with ProcessPoolExecutor(max_workers=workers or None) as executor:
+        chunk = max(1, len(files) // ((workers or os.cpu_count() or 1) * 8))  # Менше звернень до пулу
+        return list(executor.map(verify_key_file, files, [check_methods] * len(files), chunksize=chunk))
+
+def build_arg_parser():
+    """Створює розбирач аргументів командного рядка."""
+    parser = argparse.ArgumentParser(description="Перевірка взаємної однозначності та оборотності файлів ключів.")
+    parser.add_argument("paths", nargs="+", help="Файли ключів або каталоги з ними")
+    parser.add_argument("--workers", type=int, default=1, help="Кількість процесів (0 - за кількістю ядер)")
+    parser.add_argument("--check-methods", action="store_true",
+                        help="Додатково порівняти побайтові методи зі скомпільованими таблицями")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Нічого не виводити, лише код завершення")
+    parser.add_argument("--json", action="store_true", help="Вивести звіти у форматі JSON")
+    add_profile_argument(parser)
+    return parser
+
+def main(argv=None) -> int:
+    """Точка входу командного рядка. Повертає 0, якщо всі ключі коректні, інакше 1."""
+    args = build_arg_parser().parse_args(argv)
+    with profiling(args.profile):
+        return _run_command(args)
+
+def _run_command(args) -> int:
+    """Виконує команду з розібраними аргументами."""
+    reports = verify_paths(args.paths, args.workers, args.check_methods)
+    failed = [report for report in reports if not report.ok]
+    if args.quiet:
+        return 1 if failed or not reports else 0  # Лише код завершення
+    if args.json:
+        json.dump([report.to_dict() for report in reports], sys.stdout, indent=2)
+        print()
+    else:
+        for report in failed:
+            details = report.error or ", ".join(f"{name}: {values}" for name, values in report.failures.items())
+            print(f"ПОМИЛКА {report.source}: {details}")
+        print(f"Перевірено ключів: {len(reports)}, з помилками: {len(failed)}.")
+    return 1 if failed or not reports else 0
+
+if __name__ == "__main__":
+    sys.exit(main())